@@ -1,21 +1,18 @@
 import streamlit as st
-from comments import fetch_comments
-from twitter_comments import (
-    initialize_twitter_client_v2,
-    extract_tweet_id_from_url,
-    fetch_tweet_replies,
-    load_replies_in_format,
-    summarize_replies,
-    categorize_replies
-)
-from utils import get_summary
-import base64
-from transformers import pipeline
-import re
-import tweepy
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+from comments import extract_video_id_from_link
+from twitter_comments import extract_tweet_id_from_url
+from sentiment_model import get_sentiment_model
+from build_assets import CARD_WIDTHS, STATIC_DIR, VARIANTS_DIR, variant_name
+from llm_cache import get_llm_cache
+from metrics import get_metrics
+from jobs import PIPELINE_STAGES, JobManager
+from pipeline import analyze_x, analyze_youtube, refresh_watch
+from watch import WATCH_INTERVAL_SECONDS, Watch
+from outbox import OutboxSender, SMTPSettings, get_outbox
+from result_cache import get_result_cache
+import hashlib
+import os
+import time
 
 # Set page configuration
 st.set_page_config(page_title="EchoPulse | Comment Analyzer", layout="wide")
@@ -188,21 +185,53 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
-# Function to encode video to Base64
+def static_route_serves(relative_path):
+    """Whether Streamlit's static route sends this file with its real content type.
+
+    Older, Tornado-based releases do so only for a fixed list of extensions and send anything
+    else as text/plain with nosniff, which browsers will not play or render.
+    """
+    try:
+        from streamlit.web.server.app_static_file_handler import SAFE_APP_STATIC_FILE_EXTENSIONS
+    except ImportError:
+        return True
+    return os.path.splitext(relative_path)[1].lower() in SAFE_APP_STATIC_FILE_EXTENSIONS
+
+# Media is served by Streamlit's static route (server.enableStaticServing) instead of
+# being inlined as base64. The ?v= content hash lets browsers cache each file and
+# revalidate it by ETag; the route also answers range requests for the video.
 @st.cache_data
-def video_to_base64(video_path):
-    with open(video_path, "rb") as video_file:
-        return base64.b64encode(video_file.read()).decode()
+def static_url(relative_path):
+    with open(os.path.join(STATIC_DIR, relative_path), "rb") as static_file:
+        data = static_file.read()
+    if not static_route_serves(relative_path):
+        # Inlined as before static serving, on Streamlit versions that would mislabel the file
+        import base64
+        import mimetypes
+        mime_type = mimetypes.guess_type(relative_path)[0] or "application/octet-stream"
+        return f"data:{mime_type};base64,{base64.b64encode(data).decode()}"
+    version = hashlib.md5(data).hexdigest()[:12]
+    return f"app/static/{relative_path}?v={version}"
 
-video_base64 = video_to_base64("static/bg.mp4")
+def card_image_html(filename, alt):
+    """<img> for an About card, using the pre-transcoded WebP variants when they exist."""
+    variants = [
+        (os.path.relpath(os.path.join(VARIANTS_DIR, variant_name(filename, width)), STATIC_DIR), width)
+        for width in CARD_WIDTHS
+    ]
+    variants = [(path, width) for path, width in variants if os.path.exists(os.path.join(STATIC_DIR, path))]
+    if not variants:
+        return f'<img src="{static_url(filename)}" alt="{alt}" loading="lazy">'
+    srcset = ", ".join(f"{static_url(path)} {width}w" for path, width in variants)
+    return f'<img src="{static_url(variants[0][0])}" srcset="{srcset}" sizes="320px" alt="{alt}" loading="lazy">'
 
 # Home Section
 st.markdown('<section id="home"></section>', unsafe_allow_html=True)
 st.markdown(
     f"""
     <div class="banner">
-        <video autoplay muted loop id="background-video">
-            <source src="data:video/mp4;base64,{video_base64}" type="video/mp4">
+        <video autoplay muted loop playsinline preload="auto" id="background-video">
+            <source src="{static_url('bg.mp4')}" type="video/mp4">
             Your browser does not support the video tag.
         </video>
         <div class="content">
@@ -221,6 +250,130 @@ st.write("Select a platform to analyze comments and generate AI-powered summarie
 
 youtube_tab, twitter_tab = st.tabs(["YouTube", "x"])
 
+SENTIMENT_ENGINES = {"Keywords": "keywords", "Local model (CPU)": "model"}
+YOUTUBE_SUMMARY_MODES = {
+    "Full (every comment)": "full",
+    "Topic clusters": "topics",
+    "TextRank pre-filter": "prefilter",
+    "Extractive (no Gemini)": "extractive",
+}
+X_SUMMARY_MODES = {"Keyword overview": "keywords", "Topic clusters": "topics", "Extractive (no Gemini)": "extractive"}
+STAGE_LABELS = {
+    "fetched": "Fetching comments",
+    "chunked": "Splitting into chunks",
+    "mapped": "Summarizing chunks",
+    "reduced": "Combining summaries",
+}
+
+# One background job queue per server process, shared by every session
+@st.cache_resource
+def get_job_manager():
+    return JobManager(cache=get_result_cache())
+
+job_manager = get_job_manager()
+
+def current_job(state_key):
+    """The session's job, switched to its background refresh once that has a newer result."""
+    job = job_manager.get(st.session_state.get(state_key))
+    if job and job.refresh_id:
+        refresh = job_manager.get(job.refresh_id)
+        if refresh and refresh.finished and refresh.result:
+            st.session_state[state_key] = refresh.id
+            return refresh
+    return job
+
+def show_cache_note(job):
+    if job.cached_at is None:
+        return
+    minutes = int((time.time() - job.cached_at) // 60)
+    note = f"Shared result from {minutes} min ago." if minutes else "Shared result from under a minute ago."
+    if job.refresh_id:
+        note += " A fresh analysis is running in the background; rerun to pick it up."
+    st.caption(note)
+
+def show_partials(job):
+    for index in sorted(job.partials):
+        st.markdown(f"**Chunk {index + 1}:** {job.partials[index]}")
+
+def wait_for_job(job, partials=False):
+    """Show per-stage progress and streamed text until the job finishes; a rerun interrupts only this polling."""
+    progress = st.progress(0.0, text="Queued...")
+    streamed = st.empty()
+    partial_area = st.empty()
+    while not job.wait(timeout=0.1):
+        if job.output:
+            streamed.markdown(job.output_text + "▌")
+        if partials and job.partials:
+            with partial_area.container():
+                show_partials(job)
+        if job.stage is None:
+            continue
+        done, total = job.progress[job.stage]
+        stage_index = PIPELINE_STAGES.index(job.stage)
+        fraction = (stage_index + (done / total if done and total else 0.0)) / len(PIPELINE_STAGES)
+        counts = f" ({done}/{total})" if done is not None and total else ""
+        progress.progress(min(1.0, fraction), text=job.message or f"{STAGE_LABELS[job.stage]}{counts}...")
+    progress.empty()
+    streamed.empty()
+    partial_area.empty()
+
+def show_topics(result):
+    if not result["topics"]:
+        return
+    st.subheader("Topics")
+    for topic in result["topics"]:
+        st.markdown(f"**{topic['label']}** · {topic['size']} comments ({topic['share']:.0%})")
+        st.markdown(topic["summary"])
+    sent_tokens, corpus_tokens = result["token_usage"]
+    st.caption(f"Only topic representatives were summarized: {sent_tokens:,} of {corpus_tokens:,} comment tokens sent to Gemini.")
+
+def show_sentiment_breakdown(analysis, engine):
+    positive, negative, neutral = st.columns(3)
+    positive.metric("Positive", analysis["positive"])
+    negative.metric("Negative", analysis["negative"])
+    neutral.metric("Neutral", analysis["neutral"])
+    model_stats = get_sentiment_model().last_stats if engine == "model" else None
+    if model_stats:
+        st.caption(f"Local model scored {model_stats['replies']} comments at {model_stats['replies_per_second']:.0f} comments/sec.")
+
+@st.fragment(run_every=WATCH_INTERVAL_SECONDS)
+def watch_panel(source, key, result):
+    """Live sentiment, themes and summary for a watched video or post, polled in the background.
+
+    The watch starts from `result`, the analysis on screen, and only polls for newer comments.
+    """
+    state_key = f"{source}_watch"
+    watch = st.session_state.get(state_key)
+    if watch is None or (watch.source, watch.key, watch.engine) != (source, key, result["engine"]):
+        watch = st.session_state[state_key] = Watch(source, key, result)
+    job = job_manager.get(st.session_state.get(f"{state_key}_job"))
+    if job is not None and job.error:
+        st.warning(f"Last refresh failed: {job.error}")
+    if job is None or job.finished:
+        job = job_manager.get(job_manager.submit(("watch", watch.id), refresh_watch, watch))
+        st.session_state[f"{state_key}_job"] = job.id
+    if watch.snapshot is None:
+        job.wait(timeout=10)
+    snapshot = watch.snapshot
+    if snapshot is None:
+        st.caption("Starting watch...")
+        return
+
+    sentiment, previous = snapshot["sentiment"], snapshot["previous_sentiment"]
+    columns = st.columns(3)
+    for column, label in zip(columns, ("positive", "negative", "neutral")):
+        delta = sentiment[label] - previous[label] if previous else None
+        column.metric(label.capitalize(), sentiment[label], delta=delta or None)
+    st.caption("Top themes: " + ", ".join(f"{word} ({count})" for word, count in sentiment["themes"]))
+    if snapshot["summary"]:
+        st.markdown(snapshot["summary"])
+    status = "summary updated" if snapshot["resummarized"] else f"summary kept, {snapshot['pending_comments']} new comments not yet significant"
+    st.caption(
+        f"{snapshot['new_comments']} new of {snapshot['total_comments']} comments at "
+        f"{time.strftime('%H:%M:%S', time.localtime(snapshot['refreshed_at']))}; {status}. "
+        f"Checking every {WATCH_INTERVAL_SECONDS}s."
+    )
+
 with youtube_tab:
     st.header("Analyze YouTube Comments")
     
@@ -231,19 +384,57 @@ with youtube_tab:
                 "Enter YouTube video URL",
                 placeholder="Paste your YouTube video link here...",
             )
+            sample_youtube = st.checkbox(
+                "Fast mode: summarize a representative sample",
+                help="Bounds analysis time on very large videos: fetches only the most relevant threads of a video not analyzed before, then summarizes an engagement-weighted sample.",
+            )
+            youtube_partials = st.checkbox("Show chunk summaries as they finish")
+            youtube_mode = YOUTUBE_SUMMARY_MODES[st.selectbox(
+                "Summary mode", list(YOUTUBE_SUMMARY_MODES), key="youtube_mode",
+                help="Topic clusters groups comments with a local embedding model and summarizes each group from its most typical comments. "
+                     "TextRank pre-filter sends Gemini only the most central comments. Extractive quotes the most central comments directly, in under a second.",
+            )]
+            youtube_engine = SENTIMENT_ENGINES[st.selectbox("Sentiment engine", list(SENTIMENT_ENGINES), key="youtube_engine")]
             submit_youtube = st.form_submit_button("Get Summary")
 
     with right:
         if submit_youtube and url_input:
-            with st.spinner("Fetching and summarizing comments..."):
-                text = fetch_comments(url_input)
-                if text:
-                    final_summary = get_summary(text)
-                    st.subheader("Generated Summary")
-                    st.markdown(f"<div style='font-size:16px; line-height:1.6;'>{final_summary}</div>", unsafe_allow_html=True)
-                else:
-                    st.error("Unable to fetch comments. The video might have comments disabled or the URL is invalid.")
-        else:
+            try:
+                video_id = extract_video_id_from_link(url_input)
+            except Exception:
+                video_id = None
+                st.session_state.pop("youtube_job", None)
+                st.error("Invalid YouTube URL. Please check and try again.")
+            if video_id:
+                st.session_state["youtube_job"] = job_manager.submit_cached(
+                    ("youtube", video_id, sample_youtube, youtube_engine, youtube_mode),
+                    analyze_youtube, url_input, sample=sample_youtube, engine=youtube_engine, mode=youtube_mode,
+                )
+
+        youtube_job = current_job("youtube_job")
+        if youtube_job:
+            wait_for_job(youtube_job, partials=youtube_partials)
+            result = youtube_job.result
+            if youtube_job.error:
+                st.error(f"An error occurred: {youtube_job.error}")
+            elif result:
+                st.subheader("Generated Summary")
+                show_cache_note(youtube_job)
+                st.markdown(f"<div style='font-size:16px; line-height:1.6;'>\n\n{result['summary']}\n\n</div>", unsafe_allow_html=True)
+                if youtube_partials and youtube_job.partials:
+                    with st.expander("Chunk summaries"):
+                        show_partials(youtube_job)
+                show_topics(result)
+                st.caption(f"{result['comment_count']} comments collapsed into {result['unique_count']} distinct ones before summarizing.")
+                if result["coverage"] < 1.0:
+                    st.caption(f"The summary was written from a selection covering {result['coverage']:.1%} of the comments.")
+                st.subheader("Sentiment")
+                show_sentiment_breakdown(result["sentiment"], result["engine"])
+                if st.toggle("Watch for new comments", key="youtube_watching"):
+                    watch_panel("youtube", youtube_job.key[1], result)
+            else:
+                st.info("This video has no comments yet.")
+        elif not (submit_youtube and url_input):
             st.info("Submit a YouTube URL to display its summary here.")
 
 with twitter_tab:
@@ -256,56 +447,95 @@ with twitter_tab:
                 "Enter X post URL",
                 placeholder="Paste the X post URL here...",
             )
-            max_results = st.slider("Number of Comments to fetch", 10, 100, 25)
+            max_results = st.slider("Number of Comments to fetch", 10, 1000, 25)
+            twitter_mode = X_SUMMARY_MODES[st.selectbox("Summary mode", list(X_SUMMARY_MODES), key="twitter_mode")]
+            twitter_engine = SENTIMENT_ENGINES[st.selectbox("Sentiment engine", list(SENTIMENT_ENGINES), key="twitter_engine")]
             submit_tweet = st.form_submit_button("Get Summary")
 
     with right:
         if submit_tweet and tweet_url:
-            with st.spinner("Fetching and summarizing replies..."):
-                tweet_id = extract_tweet_id_from_url(tweet_url)
-                if tweet_id:
-                    client = initialize_twitter_client_v2()
-                    comments = fetch_tweet_replies(client, tweet_id, max_replies=max_results)
-                    if comments:
-                        summary = summarize_replies(comments)
-                        st.subheader("Summary of Replies")
-                        st.write(summary)
-                    else:
-                        st.error("No replies found or an error occurred.")
-                else:
-                    st.error("Invalid X post URL. Please check and try again.")
-        else:
+            tweet_id = extract_tweet_id_from_url(tweet_url)
+            if tweet_id:
+                st.session_state["twitter_job"] = job_manager.submit_cached(
+                    ("x", tweet_id, max_results, twitter_engine, twitter_mode),
+                    analyze_x, tweet_id, max_replies=max_results, engine=twitter_engine, mode=twitter_mode,
+                )
+            else:
+                st.session_state.pop("twitter_job", None)
+                st.error("Invalid X post URL. Please check and try again.")
+
+        twitter_job = current_job("twitter_job")
+        if twitter_job:
+            wait_for_job(twitter_job)
+            result = twitter_job.result
+            if twitter_job.error:
+                st.error(f"An error occurred: {twitter_job.error}")
+            elif result:
+                st.subheader("Summary of Replies")
+                show_cache_note(twitter_job)
+                if result.get("warning"):
+                    st.warning(result["warning"])
+                if result.get("complete") is False:
+                    st.caption("This partial result was not cached; submit again later to fetch the remaining replies.")
+                st.write(result["summary"])
+                show_topics(result)
+                show_sentiment_breakdown(result["sentiment"], result["engine"])
+                if st.toggle("Watch for new replies", key="twitter_watching"):
+                    watch_panel("x", twitter_job.key[1], result)
+            else:
+                st.info("No replies found for this post.")
+        elif not (submit_tweet and tweet_url):
             st.info("Submit a X URL to display its summary here.")
 
+# Diagnostics for this server process, across all sessions
+with st.expander("Diagnostics"):
+    metrics = get_metrics()
+    stages = metrics.stage_summary()
+    if stages:
+        st.markdown("**Time per stage**")
+        st.table([
+            {"stage": stage, "runs": runs, "total s": round(seconds, 2), "avg s": round(seconds / runs, 3)}
+            for stage, (runs, seconds) in sorted(stages.items())
+        ])
+        st.markdown("**Counters**")
+        st.table([
+            {"metric": name, "labels": ", ".join(f"{key}={value}" for key, value in labels.items()), "value": value}
+            for name, labels, value in metrics.counter_values()
+        ])
+    else:
+        st.caption("No analyses have run on this server yet.")
+    cache_stats = get_llm_cache().stats()
+    st.caption(
+        f"Summary cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses ({cache_stats['hit_rate']:.0%} hit rate) "
+        f"since this server started; {cache_stats['entries']} entries, {cache_stats['bytes'] / 2**20:.1f} MB on disk"
+    )
+    outbox_counts = get_outbox().counts()
+    smtp_missing = SMTPSettings.from_secrets().missing()
+    st.caption(
+        f"Email outbox: {outbox_counts['pending']} pending, {outbox_counts['sent']} sent, {outbox_counts['failed']} failed"
+        + (f"; contact form disabled until these secrets are set: {', '.join(smtp_missing)}" if smtp_missing else "")
+    )
+    st.download_button("Download metrics (Prometheus text)", metrics.to_prometheus(), file_name="echopulse.prom", mime="text/plain")
+
 # About Us Section
 st.markdown('<section id="about-us"></section>', unsafe_allow_html=True)
 st.title("About EchoPulse")
 
-# Function to encode images
-@st.cache_data
-def image_to_base64(image_path):
-    with open(image_path, "rb") as img_file:
-        return base64.b64encode(img_file.read()).decode()
-
-img_base64 = image_to_base64("static/image.png")
-img2_base64 = image_to_base64("static/image2.jpg")
-img3_base64 = image_to_base64("static/image3.png")
-
 st.markdown(
     f"""
     <div class="cards-container">
         <div class="card">
-            <img src="data:image/png;base64,{img_base64}" alt="Efficient Data Analysis">
+            {card_image_html("image.png", "Efficient Data Analysis")}
             <h3>Instant Comment Analysis</h3>
             <p>EchoPulse instantly processes comments from YouTube and X to reveal what your audience is truly thinking. Our advanced AI identifies trends and sentiments, giving you a clear view of user feedback without the manual effort.</p>
         </div>
         <div class="card">
-            <img src="data:image/jpeg;base64,{img2_base64}" alt="User-Friendly Design">
+            {card_image_html("image2.jpg", "User-Friendly Design")}
             <h3>Intuitive & Clean Interface</h3>
             <p>We designed EchoPulse to be simple and powerful. The clean interface allows you to get the insights you need quickly, making complex data analysis accessible to everyone, from creators to marketers.</p>
         </div>
         <div class="card">
-            <img src="data:image/png;base64,{img3_base64}" alt="AI-Powered Summaries">
+            {card_image_html("image3.png", "AI-Powered Summaries")}
             <h3>Smart Summaries, Not Noise</h3>
             <p>Stop scrolling through endless comments. EchoPulse uses cutting-edge AI to condense thousands of comments into concise, actionable summaries. Understand the key themes and overall sentiment in seconds.</p>
         </div>
@@ -318,39 +548,31 @@ st.markdown(
 st.markdown('<section id="contact-us"></section>', unsafe_allow_html=True)
 st.title("Contact Us")
 
+@st.cache_resource
+def get_outbox_sender():
+    """The background sender, or None while SMTP is not configured (the form then refuses messages)."""
+    settings = SMTPSettings.from_secrets()
+    if settings.missing():
+        return None
+    return OutboxSender(get_outbox(), settings).start()
+
+# Started with the app so messages queued before a restart are delivered without a new submit
+outbox_sender = get_outbox_sender()
+
 def send_email(name, sender_email, message):
+    """Queue a contact form message for the background sender; return None, or why it was not queued."""
+    if outbox_sender is None:
+        return "The contact form is not set up on this server yet."
     try:
-        # --- IMPORTANT ---
-        # 1. Replace the password with YOUR OWN 16-character Google App Password.
-        # 2. For better security, store these in Streamlit Secrets (st.secrets).
-        smtp_server = "smtp.gmail.com"
-        smtp_port = 587
-        sender_email_address = "dharanimurugaraj@gmail.com"  # YOUR EMAIL
-        sender_email_password = "xjwobumtdbxsbkpu" # YOUR APP PASSWORD
-
-        # The recipient email is also your email
-        recipient_email = "dharanimurugaraj@gmail.com"
-
-        # Create email content
-        subject = f"New Contact Form Submission from {name}"
-        body = f"Name: {name}\nEmail: {sender_email}\n\nMessage:\n{message}"
-        
-        msg = MIMEMultipart()
-        msg["From"] = sender_email_address
-        msg["To"] = recipient_email
-        msg["Subject"] = subject
-        msg.attach(MIMEText(body, "plain"))
-
-        # Send email
-        server = smtplib.SMTP(smtp_server, smtp_port)
-        server.starttls()
-        server.login(sender_email_address, sender_email_password)
-        server.sendmail(sender_email_address, recipient_email, msg.as_string())
-        server.quit()
-        return True
+        get_outbox().enqueue(
+            f"New Contact Form Submission from {name}",
+            f"Name: {name}\nEmail: {sender_email}\n\nMessage:\n{message}",
+            reply_to=sender_email,
+        )
     except Exception as e:
-        st.error(f"Error sending email: {e}")
-        return False
+        return f"Failed to send your message ({e}). Please try again later."
+    outbox_sender.notify()
+    return None
 
 with st.container():
     col1, col2 = st.columns([1,2])
@@ -363,10 +585,11 @@ with st.container():
 
             if submit_contact:
                 if name and email and message:
-                    if send_email(name, email, message):
-                        st.success("Your message has been sent successfully!")
+                    error = send_email(name, email, message)
+                    if error:
+                        st.error(error)
                     else:
-                        st.error("Failed to send your message. Please try again later.")
+                        st.success("Thanks! Your message is on its way.")
                 else:
                     st.warning("Please fill out all fields before sending.")
 
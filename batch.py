@@ -0,0 +1,179 @@
+"""Headless batch analysis: summarize and score many YouTube videos and X posts from a JSONL file.
+
+Each input line is an object with a "url" (and optionally an "id"; the URL is the id
+otherwise). Results are appended to the output JSONL as each item finishes, with per-stage
+timings. The output doubles as the checkpoint: rerunning with the same output file skips
+items already finished and retries only the ones that failed or never completed.
+
+    python batch.py urls.jsonl results.jsonl [--workers 4] [--processes N] [--sample] [--metrics run.prom]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
+
+from jobs import Job
+from metrics import get_metrics
+from pipeline import analyze_x, analyze_youtube
+from twitter_comments import extract_tweet_id_from_url
+
+# Items in flight at once; each spends most of its time waiting on the APIs and Gemini
+BATCH_WORKERS = 4
+# --mode to each pipeline's summary mode; X has no Gemini summary to pre-filter
+YOUTUBE_MODES = {"default": "full", "topics": "topics", "extractive": "extractive", "prefilter": "prefilter"}
+X_MODES = {"default": "keywords", "topics": "topics", "extractive": "extractive", "prefilter": "keywords"}
+X_HOSTS = {"x.com", "twitter.com", "mobile.twitter.com", "www.x.com", "www.twitter.com"}
+
+
+def source_for_url(url):
+    return "x" if urlparse(url).netloc.lower() in X_HOSTS else "youtube"
+
+
+def read_items(path):
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            if not item.get("url"):
+                raise ValueError(f"{path}:{line_number}: missing \"url\"")
+            item.setdefault("id", item["url"])
+            yield item
+
+
+def read_checkpoint(path):
+    """Return the ids already finished in an earlier run's output.
+
+    Finished means "ok", or "empty": fetched without error but with no comments. Every "error",
+    including API quota, 5xx and auth failures while fetching, and every "partial" result
+    (cut short by a rate limit) is retried.
+    """
+    finished = set()
+    if not os.path.exists(path):
+        return finished
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # a line cut short by a crash
+            if record.get("status") in ("ok", "empty"):
+                finished.add(record["id"])
+    return finished
+
+
+class ResultWriter:
+    """Appends one JSON line per result, flushed to disk before the item counts as done."""
+
+    def __init__(self, path):
+        self._file = open(path, "a+", encoding="utf-8")
+        self._lock = threading.Lock()
+        # Start on a fresh line if the previous run died mid-write
+        if self._file.tell():
+            self._file.seek(self._file.tell() - 1)
+            if self._file.read(1) != "\n":
+                self._file.write("\n")
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+def analyze_item(item, cpu, sample=False, engine="keywords", max_replies=100, mode="default"):
+    """Run one item through the pipeline and return its output record."""
+    url = item["url"]
+    source = source_for_url(url)
+    job = Job((source, url))
+    record = {"id": item["id"], "url": url, "source": source}
+    try:
+        if source == "x":
+            tweet_id = extract_tweet_id_from_url(url)
+            if not tweet_id:
+                raise ValueError("Invalid X post URL")
+            result = analyze_x(job, tweet_id, max_replies=max_replies, engine=engine, cpu=cpu,
+                               mode=X_MODES.get(mode, "keywords"))
+        else:
+            result = analyze_youtube(job, url, sample=sample, engine=engine, cpu=cpu,
+                                     mode=YOUTUBE_MODES.get(mode, "full"))
+        if not result:
+            record["status"] = "empty"
+        else:
+            # Cut short by a rate limit; kept, but retried on resume like an error
+            record["status"] = "ok" if result.get("complete", True) else "partial"
+        record["result"] = result
+    except Exception as e:
+        # Fetch failures raise clients.FetchError, so they land here rather than as "empty"
+        record["status"] = "error"
+        record["error"] = str(e) or type(e).__name__
+        # Retried on resume like any error; flagged so a run's output shows which won't come right
+        record["permanent"] = getattr(e, "permanent", False)
+    timings = job.stage_timings()
+    timings["total"] = time.time() - job.created_at
+    record["timings"] = {stage: round(seconds, 3) for stage, seconds in timings.items()}
+    return record
+
+
+def run_batch(input_path, output_path, workers=BATCH_WORKERS, processes=None, sample=False,
+              engine="keywords", max_replies=100, mode="default"):
+    """Analyze every unfinished item in input_path, appending results to output_path."""
+    finished = read_checkpoint(output_path)
+    items = [item for item in read_items(input_path) if item["id"] not in finished]
+    print(f"{len(items)} items to analyze ({len(finished)} already done)", file=sys.stderr)
+    if not items:
+        return 0
+
+    writer = ResultWriter(output_path)
+    failures = 0
+    # Dedup and sentiment scoring are CPU-bound; spawned workers avoid forking a threaded process
+    with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn")) as cpu, \
+            ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(analyze_item, item, cpu, sample, engine, max_replies, mode) for item in items]
+        try:
+            for done, future in enumerate(as_completed(futures), 1):
+                record = future.result()
+                writer.write(record)
+                failures += record["status"] == "error"
+                print(f"[{done}/{len(items)}] {record['status']:<7} {record['timings']['total']:7.1f}s  {record['id']}",
+                      file=sys.stderr)
+        finally:
+            writer.close()
+    return 1 if failures else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", help="JSONL file with one {\"url\": ...} object per line")
+    parser.add_argument("output", help="JSONL results file, also used to resume an interrupted run")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS, help="items fetched and summarized at once")
+    parser.add_argument("--processes", type=int, default=None, help="scoring processes (default: CPU count)")
+    parser.add_argument("--sample", action="store_true", help="summarize an engagement-weighted sample of large videos")
+    parser.add_argument("--engine", choices=["keywords", "model"], default="keywords")
+    parser.add_argument("--max-replies", type=int, default=100, help="replies fetched per X post")
+    parser.add_argument("--mode", choices=["default", "topics", "extractive", "prefilter"], default="default",
+                        help="topics: per topic cluster from representative comments; extractive: quote the most "
+                             "central comments without Gemini; prefilter: Gemini on the top-ranked comments only (YouTube)")
+    parser.add_argument("--metrics", help="write stage timings, tokens and quota used to this Prometheus text file")
+    args = parser.parse_args()
+    try:
+        return run_batch(args.input, args.output, workers=args.workers, processes=args.processes,
+                         sample=args.sample, engine=args.engine, max_replies=args.max_replies,
+                         mode=args.mode)
+    finally:
+        if args.metrics:
+            get_metrics().write_prometheus(args.metrics)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
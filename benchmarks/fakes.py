@@ -0,0 +1,243 @@
+"""Local stand-ins for the YouTube Data API, X API v2 and the Gemini chat model.
+
+The fakes answer the same calls the app makes (commentThreads().list, comments().list,
+search_recent_tweets, invoke/stream) from synthetic payloads, or from recorded commentThreads pages saved as JSON,
+so the pipeline can be benchmarked without network access or API quota.
+"""
+import datetime
+import json
+import random
+import threading
+import time
+
+# Comment vocabulary: filler words plus a few sentiment keywords the categorizer looks for
+FILLER_WORDS = (
+    "the video this that channel part explained about when really just more minute episode song "
+    "editing camera voice music point idea version first second last time people watch again "
+    "tutorial update review setup code game team view question answer example topic"
+).split()
+SENTIMENT_WORDS = ["great", "love", "helpful", "thanks", "amazing", "bad", "boring", "broken", "worst", "slow"]
+# Share of comments that repeat an earlier one verbatim, as spam and "first!" comments do
+REPEAT_RATE = 0.05
+# Replies per thread: most threads have a few, and a small share run long
+REPLY_COUNTS = (0, 0, 0, 1, 2, 4)
+LONG_THREAD_RATE = 0.002
+LONG_THREAD_REPLIES = (8, 40, 150)
+# commentThreads embeds only the first few replies; the rest need comments().list, 100 per page
+EMBEDDED_REPLIES = 5
+REPLY_PAGE_SIZE = 100
+
+
+def synthetic_texts(count, seed=0):
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(count):
+        if texts and rng.random() < REPEAT_RATE:
+            texts.append(rng.choice(texts))
+            continue
+        words = rng.choices(FILLER_WORDS, k=rng.randint(4, 30))
+        if rng.random() < 0.6:
+            words.insert(rng.randrange(len(words) + 1), rng.choice(SENTIMENT_WORDS))
+        texts.append(" ".join(words).capitalize())
+    return texts
+
+
+def _youtube_comment(comment_id, text, published_at, parent_id=None):
+    snippet = {
+        "textOriginal": text,
+        "authorDisplayName": f"user{len(text) * 31 % 5000}",
+        "likeCount": len(text) % 17,
+        "publishedAt": published_at,
+    }
+    if parent_id:
+        snippet["parentId"] = parent_id
+    return {"id": comment_id, "snippet": snippet}
+
+
+def synthetic_youtube(comment_count, page_size=100, seed=0):
+    """Return (commentThreads pages, {thread id: every reply}) for `comment_count` comments.
+
+    As with the real API, a thread embeds at most EMBEDDED_REPLIES replies while its
+    totalReplyCount counts them all, so long threads must be expanded through comments().list.
+    """
+    rng = random.Random(seed)
+    texts = synthetic_texts(comment_count, seed)
+    start = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+    threads = []
+    all_replies = {}
+    position = 0
+    while position < len(texts):
+        thread_id = f"t{len(threads)}"
+        if rng.random() < LONG_THREAD_RATE:
+            reply_count = rng.choice(LONG_THREAD_REPLIES)
+        else:
+            reply_count = rng.choice(REPLY_COUNTS)
+        reply_count = min(reply_count, len(texts) - position - 1)
+        published_at = (start + datetime.timedelta(seconds=position)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        top_level = _youtube_comment(thread_id, texts[position], published_at)
+        replies = [
+            _youtube_comment(f"{thread_id}.r{i}", texts[position + 1 + i], published_at, parent_id=thread_id)
+            for i in range(reply_count)
+        ]
+        thread = {"id": thread_id, "snippet": {"topLevelComment": top_level, "totalReplyCount": reply_count}}
+        if replies:
+            thread["replies"] = {"comments": replies[:EMBEDDED_REPLIES]}
+            all_replies[thread_id] = replies
+        threads.append(thread)
+        position += 1 + reply_count
+
+    pages = [{"items": threads[i:i + page_size]} for i in range(0, len(threads), page_size)]
+    return pages, all_replies
+
+
+def synthetic_thread_pages(comment_count, page_size=100, seed=0):
+    """commentThreads pages for `comment_count` comments; long threads embed only their first replies."""
+    return synthetic_youtube(comment_count, page_size, seed)[0]
+
+
+def load_recorded_pages(path):
+    """Recorded commentThreads responses: a JSON list of pages, or a single page object."""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return data if isinstance(data, list) else [data]
+
+
+class _Request:
+    def __init__(self, response):
+        self._response = response
+
+    def execute(self):
+        return self._response
+
+
+class _FakeComments:
+    """comments().list: the replies to one thread, REPLY_PAGE_SIZE per page."""
+
+    def __init__(self, youtube):
+        self.youtube = youtube
+
+    def list(self, parentId, pageToken=None, maxResults=REPLY_PAGE_SIZE, **kwargs):
+        youtube = self.youtube
+        with youtube._lock:
+            youtube.reply_calls += 1
+        if youtube.latency:
+            time.sleep(youtube.latency)
+        replies = youtube.replies.get(parentId, [])
+        start = int(pageToken or 0)
+        page = {"items": replies[start:start + maxResults]}
+        if start + maxResults < len(replies):
+            page["nextPageToken"] = str(start + maxResults)
+        return _Request(page)
+
+
+class FakeYouTube:
+    """Serves commentThreads().list pages in order, linking them with nextPageToken, and the
+    replies of long threads through comments().list, each call optionally taking `latency` seconds.
+
+    `replies` maps a thread id to all of its replies (see synthetic_youtube). Threads are
+    copied per response, so expanding their replies never changes the pages served next time.
+    """
+
+    def __init__(self, pages, replies=None, latency=0.0):
+        self.pages = pages
+        self.replies = replies or {}
+        self.latency = latency
+        self.calls = 0
+        self.reply_calls = 0
+        self._lock = threading.Lock()
+
+    def commentThreads(self):
+        return self
+
+    def comments(self):
+        return _FakeComments(self)
+
+    def list(self, pageToken=None, **kwargs):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        index = int(pageToken or 0)
+        page = dict(self.pages[index])
+        page["items"] = [dict(thread) for thread in page.get("items", [])]
+        page.pop("nextPageToken", None)
+        if index + 1 < len(self.pages):
+            page["nextPageToken"] = str(index + 1)
+        return _Request(page)
+
+
+class _Tweet:
+    __slots__ = ("id", "conversation_id", "author_id", "text", "created_at", "public_metrics")
+
+    def __init__(self, tweet_id, conversation_id, text, created_at):
+        self.id = tweet_id
+        self.conversation_id = conversation_id
+        self.author_id = tweet_id % 5000
+        self.text = text
+        self.created_at = created_at
+        self.public_metrics = {"like_count": len(text) % 13, "reply_count": 0}
+
+
+class _Response:
+    __slots__ = ("data", "meta")
+
+    def __init__(self, data, meta):
+        self.data = data
+        self.meta = meta
+
+
+class FakeX:
+    """Answers search_recent_tweets for one conversation, newest reply first, paged by next_token."""
+
+    def __init__(self, texts, conversation_id=1):
+        start = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+        self.conversation_id = conversation_id
+        self.tweets = [
+            _Tweet(conversation_id + len(texts) - i, conversation_id, text, start + datetime.timedelta(seconds=len(texts) - i))
+            for i, text in enumerate(texts)
+        ]
+        self.calls = 0
+
+    def search_recent_tweets(self, query, max_results=10, since_id=None, next_token=None, **kwargs):
+        self.calls += 1
+        tweets = self.tweets
+        if since_id is not None:
+            tweets = [tweet for tweet in tweets if tweet.id > int(since_id)]
+        start = int(next_token or 0)
+        page = tweets[start:start + max_results]
+        meta = {"result_count": len(page)}
+        if start + max_results < len(tweets):
+            meta["next_token"] = str(start + max_results)
+        return _Response(page, meta)
+
+
+class _Message:
+    __slots__ = ("content",)
+
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeChatModel:
+    """Gemini stand-in: sleeps `latency` seconds per call and returns a short extract of the prompt."""
+
+    model = "fake-gemini"
+
+    def __init__(self, latency=0.0, summary_words=60):
+        self.latency = latency
+        self.summary_words = summary_words
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _summary(self, prompt):
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return " ".join(prompt.split()[6:6 + self.summary_words])
+
+    def invoke(self, prompt):
+        return _Message(self._summary(prompt))
+
+    def stream(self, prompt):
+        for word in self._summary(prompt).split(" "):
+            yield _Message(word + " ")
@@ -0,0 +1,110 @@
+"""Cold-start import benchmark for the modules app.py loads before its first render.
+
+Each run imports the app's modules in a fresh interpreter with -X importtime, on top of
+an already-imported Streamlit (whose own cost the app cannot avoid). The run fails when
+the added import time exceeds the budget or when a heavy dependency that should only
+load on submit (LangChain, the Google API client, tweepy, torch, ...) gets imported.
+
+    python benchmarks/startup.py [--runs 5] [--budget-ms 150]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Local modules imported by app.py at startup
+APP_MODULES = [
+    "comments",
+    "twitter_comments",
+    "utils",
+    "llm_cache",
+    "dedup",
+    "sampling",
+    "jobs",
+    "metrics",
+    "watch",
+    "pipeline",
+    "sentiment_model",
+    "topics",
+    "extractive",
+    "outbox",
+    "result_cache",
+    "build_assets",
+]
+
+# Dependencies that must stay out of the cold-start path
+LAZY_MODULES = [
+    "googleapiclient",
+    "pytube",
+    "tweepy",
+    "langchain",
+    "langchain_core",
+    "langchain_google_genai",
+    "langchain_text_splitters",
+    "tiktoken",
+    "numpy",
+    "scipy",
+    "torch",
+    "transformers",
+    "PIL",
+]
+
+STARTUP_BUDGET_MS = 150.0
+
+
+def _import_profile():
+    """Import the app modules once in a fresh interpreter and return {module: cumulative_us}."""
+    code = "import streamlit\nimport " + ", ".join(APP_MODULES)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+    )
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        try:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            profile[name.strip()] = int(cumulative)
+        except ValueError:
+            continue
+    return profile
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS)
+    args = parser.parse_args()
+
+    totals = []
+    per_module = {name: [] for name in APP_MODULES}
+    loaded_lazy = set()
+    for _ in range(args.runs):
+        profile = _import_profile()
+        totals.append(sum(profile.get(name, 0) for name in APP_MODULES) / 1000.0)
+        for name in APP_MODULES:
+            per_module[name].append(profile.get(name, 0) / 1000.0)
+        loaded_lazy.update(name for name in LAZY_MODULES if name in profile)
+
+    print(f"app module import time (median of {args.runs} runs, excluding streamlit):")
+    for name in sorted(APP_MODULES, key=lambda name: -statistics.median(per_module[name])):
+        print(f"  {name:<20} {statistics.median(per_module[name]):8.1f} ms")
+    total = statistics.median(totals)
+    print(f"  {'total':<20} {total:8.1f} ms  (budget {args.budget_ms:.0f} ms)")
+
+    failed = False
+    if loaded_lazy:
+        print("FAIL: heavy dependencies imported at startup: " + ", ".join(sorted(loaded_lazy)))
+        failed = True
+    if total > args.budget_ms:
+        print("FAIL: startup import time is over budget")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
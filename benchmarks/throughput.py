@@ -0,0 +1,193 @@
+"""Offline throughput and peak-memory benchmark for the comment pipeline.
+
+Fetching, formatting, sentiment scoring, extractive ranking, chunking and the summarize orchestration run at
+1k/10k/100k comments against the local fakes in benchmarks/fakes.py, so no API key, quota or
+network is needed. Throughput is the median over --repeat runs; peak memory comes from one
+extra run under tracemalloc so tracing does not skew the timings.
+
+Results are compared with benchmarks/baselines.json when it exists, and the run fails on a
+regression beyond --tolerance. Baselines are machine-specific: record them with --save on the
+machine that compares against them.
+
+    python benchmarks/throughput.py [--sizes 1000 10000 100000] [--repeat 3] [--save]
+    python benchmarks/throughput.py --fixture benchmarks/fixtures/recorded_pages.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from fakes import FakeChatModel, FakeX, FakeYouTube, load_recorded_pages, synthetic_youtube  # noqa: E402
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+DEFAULT_SIZES = [1000, 10000, 100000]
+# Simulated Gemini round trip; the map phase overlaps these up to MAP_CONCURRENCY at a time
+LLM_LATENCY_SECONDS = 0.02
+# Allowed slowdown / memory growth against the baseline before the run fails
+TOLERANCE = 0.2
+
+
+def _tokens_available():
+    """Chunking and summarizing count tiktoken tokens; the vocabulary must already be cached offline."""
+    from tokens import get_encoder
+    try:
+        get_encoder()
+    except Exception as e:
+        print(f"skipping chunking and summarize: tiktoken encoding unavailable ({type(e).__name__})")
+        return False
+    return True
+
+
+def _tile_pages(pages, comment_count):
+    """Repeat recorded pages until they hold at least `comment_count` comments."""
+    from comments import thread_to_comments
+    tiled, total = [], 0
+    while total < comment_count:
+        for page in pages:
+            tiled.append(page)
+            total += sum(len(thread_to_comments(thread)) for thread in page.get("items", []))
+            if total >= comment_count:
+                break
+    return tiled
+
+
+def build_cases(size, pages, replies, llm_latency, with_tokens):
+    """Return [(name, fn)] for one input size; each fn runs the measured step once."""
+    import contextlib
+    import comments
+    from chunking import pack_comments
+    from comments import expand_reply_threads, iter_comment_threads, load_comments_in_format
+    from extractive import extractive_summary
+    from summarizer import MAP_CONCURRENCY, SummaryEngine
+    from twitter_comments import _to_comment, categorize_replies, iter_tweet_replies
+
+    youtube = FakeYouTube(pages, replies)
+    # Reply expansion checks clients out of the pool; serve it from the fake instead
+    comments.start_youtube_service = lambda: contextlib.nullcontext(youtube)
+
+    def fetch_youtube():
+        # Includes the reply worker pool and the reply rate limiter for threads longer than their embedded replies
+        return list(expand_reply_threads(iter_comment_threads(youtube, "benchmark", max_threads=None)))
+
+    threads = fetch_youtube()
+    corpus = load_comments_in_format(threads)
+    texts = corpus.texts[:size]
+    x_client = FakeX(texts)
+
+    cases = [
+        ("fetch_youtube", fetch_youtube),
+        ("load_comments_in_format", lambda: load_comments_in_format(threads)),
+        ("fetch_x", lambda: [_to_comment(tweet) for tweet in iter_tweet_replies(x_client, 1, max_replies=size)]),
+        ("categorize_replies", lambda: categorize_replies(texts)),
+        ("extractive_summary", lambda: extractive_summary(corpus[:size])),
+    ]
+    if with_tokens:
+        chunks, _ = pack_comments(corpus)
+
+        def chunking():
+            # Forget cached token counts so every run tokenizes the corpus again
+            for comment in corpus:
+                comment.token_count = None
+            return pack_comments(corpus)
+
+        def summarize():
+            # No rate limit or cache: this measures the orchestration around the fake model's latency
+            engine = SummaryEngine(FakeChatModel(llm_latency), concurrency=MAP_CONCURRENCY, requests_per_minute=10**9)
+            return engine.summarize(chunks)
+
+        cases += [
+            ("chunking", chunking),
+            ("summarize", summarize),
+        ]
+    return cases
+
+
+def measure(fn, repeat):
+    """Return (median seconds, peak traced bytes) for fn."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return statistics.median(timings), peak
+
+
+def load_baselines(path=BASELINES_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(result, baseline, tolerance):
+    """Return a list of regression messages for one case."""
+    problems = []
+    if result["comments_per_second"] < baseline["comments_per_second"] * (1 - tolerance):
+        problems.append(f"throughput {result['comments_per_second']:.0f}/s vs baseline {baseline['comments_per_second']:.0f}/s")
+    if result["peak_mb"] > baseline["peak_mb"] * (1 + tolerance):
+        problems.append(f"peak memory {result['peak_mb']:.1f} MB vs baseline {baseline['peak_mb']:.1f} MB")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="comment counts to benchmark")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--llm-latency", type=float, default=LLM_LATENCY_SECONDS, help="seconds per fake Gemini call")
+    parser.add_argument("--fixture", help="recorded commentThreads pages (JSON) to use instead of synthetic comments")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--save", action="store_true", help="store these results as the new baselines")
+    args = parser.parse_args()
+
+    recorded = load_recorded_pages(args.fixture) if args.fixture else None
+    with_tokens = _tokens_available()
+    baselines = load_baselines()
+    results = {}
+    regressions = []
+
+    print(f"{'case':<26} {'comments':>9} {'median s':>10} {'comments/s':>12} {'peak MB':>9}  vs baseline")
+    for size in args.sizes:
+        pages, replies = (_tile_pages(recorded, size), None) if recorded else synthetic_youtube(size)
+        for name, fn in build_cases(size, pages, replies, args.llm_latency, with_tokens):
+            seconds, peak = measure(fn, args.repeat)
+            key = f"{name}/{size}"
+            result = {"seconds": round(seconds, 4), "comments_per_second": round(size / seconds, 1),
+                      "peak_mb": round(peak / 2**20, 2)}
+            results[key] = result
+
+            note = "no baseline"
+            if key in baselines:
+                problems = compare(result, baselines[key], args.tolerance)
+                regressions += [f"{key}: {problem}" for problem in problems]
+                change = result["comments_per_second"] / baselines[key]["comments_per_second"] - 1
+                note = f"{change:+.0%} throughput" + ("  REGRESSION" if problems else "")
+            print(f"{name:<26} {size:>9} {seconds:>10.3f} {result['comments_per_second']:>12.0f} "
+                  f"{result['peak_mb']:>9.1f}  {note}")
+
+    if args.save:
+        baselines.update(results)
+        with open(BASELINES_PATH, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"saved {len(results)} baselines to {os.path.relpath(BASELINES_PATH, REPO_ROOT)}")
+
+    if regressions:
+        print("FAIL: " + "; ".join(regressions))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
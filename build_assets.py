@@ -0,0 +1,36 @@
+"""Pre-transcode the About-section card images into size-appropriate WebP variants.
+
+The cards render about 270px wide, so 320px and 640px (high-DPI) variants replace the
+1024px originals; app.py falls back to the originals when no variants are present.
+
+    python build_assets.py
+"""
+import os
+
+STATIC_DIR = "static"
+VARIANTS_DIR = os.path.join(STATIC_DIR, "variants")
+CARD_IMAGES = ["image.png", "image2.jpg", "image3.png"]
+CARD_WIDTHS = [320, 640]
+WEBP_QUALITY = 80
+
+
+def variant_name(filename, width):
+    return f"{os.path.splitext(filename)[0]}-{width}.webp"
+
+
+def build_card_variants():
+    from PIL import Image
+
+    os.makedirs(VARIANTS_DIR, exist_ok=True)
+    for filename in CARD_IMAGES:
+        with Image.open(os.path.join(STATIC_DIR, filename)) as image:
+            image = image.convert("RGB")
+            for width in CARD_WIDTHS:
+                height = round(image.height * width / image.width)
+                target = os.path.join(VARIANTS_DIR, variant_name(filename, width))
+                image.resize((width, height), Image.LANCZOS).save(target, "WEBP", quality=WEBP_QUALITY, method=6)
+                print(f"{target}: {os.path.getsize(target) // 1024} KB")
+
+
+if __name__ == "__main__":
+    build_card_variants()
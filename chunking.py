@@ -0,0 +1,54 @@
+from records import Comment, CommentCorpus
+from tokens import get_encoder
+
+# Comment tokens per map call. Gemini's context window is far larger; chunks this size keep
+# map calls few and full while leaving them parallel and their summaries focused.
+MAP_CHUNK_TOKENS = 32000
+
+
+def _split_oversized(text, max_tokens):
+    """Split one text longer than max_tokens on token boundaries."""
+    encoder = get_encoder()
+    tokens = encoder.encode_ordinary(text)
+    return [
+        (encoder.decode(tokens[start:start + max_tokens]), len(tokens[start:start + max_tokens]))
+        for start in range(0, len(tokens), max_tokens)
+    ]
+
+
+def pack_comments(comments, max_tokens=MAP_CHUNK_TOKENS):
+    """Pack whole comments, one per line, into chunks of at most `max_tokens` tokens.
+
+    `comments` is a CommentCorpus (whose cached token counts are reused) or plain text,
+    taken one comment per line. Returns (chunks, chunk_token_counts); a single comment
+    longer than `max_tokens` is the only thing ever cut, on token boundaries.
+    """
+    if isinstance(comments, str):
+        comments = CommentCorpus(Comment(None, text=line) for line in comments.splitlines() if line.strip())
+    elif not isinstance(comments, CommentCorpus):
+        comments = CommentCorpus(comments)
+
+    chunks, chunk_tokens = [], []
+    lines, used = [], 0
+
+    def flush():
+        nonlocal lines, used
+        if lines:
+            chunks.append("".join(lines))
+            chunk_tokens.append(used)
+            lines, used = [], 0
+
+    for comment, tokens in zip(comments, comments.token_counts):
+        cost = tokens + 1  # the newline separator
+        if cost > max_tokens:
+            flush()
+            for piece, piece_tokens in _split_oversized(comment.display_text, max_tokens - 1):
+                chunks.append(piece + "\n")
+                chunk_tokens.append(piece_tokens + 1)
+            continue
+        if used + cost > max_tokens:
+            flush()
+        lines.append(f"{comment.display_text}\n")
+        used += cost
+    flush()
+    return chunks, chunk_tokens
@@ -0,0 +1,118 @@
+import json
+import threading
+from contextlib import contextmanager
+import streamlit as st
+from metrics import get_metrics
+
+# Connections kept open per host: the shared X session's pool and the idle YouTube clients
+HTTP_POOL_SIZE = 16
+GEMINI_MODEL = "gemini-pro-latest"
+
+
+
+class FetchError(Exception):
+    """A YouTube or X fetch failed; the message is meant for the user.
+
+    `permanent` marks failures retrying won't fix (comments disabled, post not found).
+    """
+
+    def __init__(self, message, permanent=False):
+        super().__init__(message)
+        self.permanent = permanent
+
+
+_lock = threading.Lock()
+_youtube_document = None
+# Idle YouTube clients, each with its own keep-alive connection, checked out by whichever thread needs one
+_youtube_pool = []
+_twitter_client = None
+_chat_models = {}
+
+
+def _youtube_discovery_document():
+    """The YouTube discovery document, read and parsed once per process."""
+    global _youtube_document
+    if _youtube_document is not None:
+        return _youtube_document
+    # Built outside the lock: a network fetch must not stall every other client lookup. Threads
+    # racing here on a cold start each build a copy and the first one stored wins.
+    from googleapiclient import discovery_cache
+    document = discovery_cache.get_static_doc(st.secrets["API_SERVICE_NAME"], st.secrets['API_VERSION'])
+    if document is None:
+        # No bundled copy for this API version; fetch it once over the network
+        from googleapiclient.discovery import build
+        service = build(st.secrets["API_SERVICE_NAME"], st.secrets['API_VERSION'], developerKey=st.secrets['YOUTUBE_API_KEY'])
+        document = service._rootDesc
+    document = json.loads(document) if isinstance(document, str) else document
+    with _lock:
+        if _youtube_document is None:
+            _youtube_document = document
+        return _youtube_document
+
+
+def _count_youtube_bytes(request):
+    """Wrap an httplib2 request method to record response sizes."""
+    def counted(*args, **kwargs):
+        response, content = request(*args, **kwargs)
+        get_metrics().inc("echopulse_fetched_bytes_total", len(content or b""), source="youtube")
+        return response, content
+    return counted
+
+
+def _count_x_bytes(response, *args, **kwargs):
+    get_metrics().inc("echopulse_fetched_bytes_total", len(response.content or b""), source="x")
+
+
+def _build_youtube_service():
+    import httplib2
+    from googleapiclient.discovery import build_from_document
+    http = httplib2.Http()
+    http.request = _count_youtube_bytes(http.request)
+    return build_from_document(
+        _youtube_discovery_document(),
+        developerKey=st.secrets['YOUTUBE_API_KEY'],
+        http=http,
+    )
+
+
+@contextmanager
+def youtube_service():
+    """Check out a YouTube client from the process-wide pool for the duration of a `with` block.
+
+    httplib2 connections are not thread-safe, so a client belongs to one thread at a time.
+    Returned clients keep their keep-alive connection for the next thread, whether that is
+    a rerun, another session, a job worker or a reply worker.
+    """
+    with _lock:
+        service = _youtube_pool.pop() if _youtube_pool else None
+    if service is None:
+        service = _build_youtube_service()
+    try:
+        yield service
+    finally:
+        with _lock:
+            if len(_youtube_pool) < HTTP_POOL_SIZE:
+                _youtube_pool.append(service)
+
+
+def get_twitter_client():
+    """Return the process-wide tweepy Client, whose pooled requests session is shared by all sessions."""
+    global _twitter_client
+    with _lock:
+        if _twitter_client is None:
+            import tweepy
+            from requests.adapters import HTTPAdapter
+            client = tweepy.Client(bearer_token=st.secrets["TWITTER_BEARER_TOKEN"])
+            client.session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE))
+            client.session.hooks["response"].append(_count_x_bytes)
+            _twitter_client = client
+        return _twitter_client
+
+
+def get_chat_model(model=GEMINI_MODEL):
+    """Return the shared Gemini chat model for `model`, built on first use."""
+    with _lock:
+        if model not in _chat_models:
+            from langchain_google_genai import ChatGoogleGenerativeAI
+            _chat_models[model] = ChatGoogleGenerativeAI(model=model, google_api_key=st.secrets['GEMINI_API_KEY'])
+        return _chat_models[model]
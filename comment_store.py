@@ -0,0 +1,142 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from records import COMMENT_FIELDS, Comment
+
+# On-disk location of the comment store (override with ECHOPULSE_COMMENT_STORE)
+COMMENT_STORE_PATH = os.getenv("ECHOPULSE_COMMENT_STORE", os.path.join(".echopulse", "comments.sqlite3"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS comments (
+    source TEXT NOT NULL,
+    key TEXT NOT NULL,
+    comment_id TEXT NOT NULL,
+    parent_id TEXT,
+    author TEXT,
+    text TEXT NOT NULL,
+    like_count INTEGER NOT NULL DEFAULT 0,
+    reply_count INTEGER NOT NULL DEFAULT 0,
+    published_at TEXT,
+    PRIMARY KEY (source, key, comment_id)
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    source TEXT NOT NULL,
+    key TEXT NOT NULL,
+    last_seen_id TEXT,
+    last_seen_at TEXT,
+    synced_at REAL NOT NULL,
+    resume_token TEXT,
+    resume_floor_id TEXT,
+    PRIMARY KEY (source, key)
+);
+"""
+# Columns added to sync_state after stores were first created
+_SYNC_STATE_COLUMNS = {"resume_token": "TEXT", "resume_floor_id": "TEXT"}
+
+
+class CommentStore:
+    """SQLite-backed store of fetched comments keyed by (source, video_id / conversation_id)."""
+
+    def __init__(self, path=COMMENT_STORE_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(sync_state)")}
+            for column, column_type in _SYNC_STATE_COLUMNS.items():
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE sync_state ADD COLUMN {column} {column_type}")
+
+    @contextmanager
+    def _connect(self):
+        # A short-lived connection per call keeps the store safe to share across threads
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def sync_state(self, source, key):
+        """Return (last_seen_id, last_seen_at, synced_at, resume_token, resume_floor_id), or None if never synced.
+
+        A resume token marks a gap left by a sync that stopped early: the page where fetching
+        should continue. YouTube fills the gap until it reaches a thread already stored, and
+        leaves resume_floor_id unset; X searches it with since_id = resume_floor_id, the
+        high-water mark before that sync.
+        """
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT last_seen_id, last_seen_at, synced_at, resume_token, resume_floor_id "
+                "FROM sync_state WHERE source = ? AND key = ?",
+                (source, key),
+            ).fetchone()
+
+    def has_comment(self, source, key, comment_id):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT 1 FROM comments WHERE source = ? AND key = ? AND comment_id = ?",
+                (source, key, comment_id),
+            ).fetchone()
+        return row is not None
+
+    def add_comments(self, source, key, comments):
+        """Insert Comment records, returning the ones not stored before."""
+        added = []
+        with self._connect() as conn:
+            for comment in comments:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO comments (source, key, comment_id, parent_id, author, text, "
+                    "like_count, reply_count, published_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (source, key) + comment.as_tuple(),
+                )
+                if cursor.rowcount:
+                    added.append(comment)
+        return added
+
+    def mark_synced(self, source, key, last_seen_id=None, last_seen_at=None, resume_token=None, resume_floor_id=None):
+        """Record a refresh, keeping the previous high-water mark when none is given.
+
+        The resume token and floor are replaced every time: None means no gap is left.
+        """
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO sync_state (source, key, last_seen_id, last_seen_at, synced_at, resume_token, resume_floor_id) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(source, key) DO UPDATE SET "
+                "last_seen_id = COALESCE(excluded.last_seen_id, last_seen_id), "
+                "last_seen_at = COALESCE(excluded.last_seen_at, last_seen_at), "
+                "synced_at = excluded.synced_at, "
+                "resume_token = excluded.resume_token, "
+                "resume_floor_id = excluded.resume_floor_id",
+                (source, key, last_seen_id, last_seen_at, time.time(), resume_token, resume_floor_id),
+            )
+
+    def load_comments(self, source, key, limit=None, newest_first=False):
+        """Return stored Comment records in insertion order (or newest published first), optionally capped."""
+        query = "SELECT " + ", ".join(COMMENT_FIELDS) + " FROM comments WHERE source = ? AND key = ?"
+        query += " ORDER BY published_at DESC, rowid DESC" if newest_first else " ORDER BY rowid"
+        params = (source, key)
+        if limit is not None:
+            query += " LIMIT ?"
+            params += (limit,)
+        with self._connect() as conn:
+            return [Comment(*row) for row in conn.execute(query, params)]
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_comment_store():
+    """Return the process-wide CommentStore, creating it on first use."""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = CommentStore()
+        return _default_store
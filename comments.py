@@ -1,54 +1,270 @@
-import streamlit as st
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
-from pytube import extract
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from dotenv import load_dotenv
+from ratelimit import RateLimiter
+from metrics import get_metrics
+from comment_store import get_comment_store
+from clients import FetchError, youtube_service
+from records import Comment, CommentCorpus
 
 load_dotenv()
 
-api_server_name = st.secrets["API_SERVICE_NAME"]
-api_version = st.secrets['API_VERSION']
-youtube_api_key = st.secrets['YOUTUBE_API_KEY']
+# Upper bound on top-level threads pulled per video (None follows every page)
+MAX_COMMENT_THREADS = 10000
+# Fast mode on a video not yet stored: the most relevant threads with their embedded replies only,
+# enough to fill the sampler's token budget without paging through the whole video
+SAMPLE_MAX_THREADS = 1000
 
+# Reply expansion: comments().list costs one quota unit per page, so keep the
+# worker pool bounded and the request rate under the per-project limits
+REPLY_WORKERS = 8
+REPLY_REQUESTS_PER_SECOND = 20
+REPLY_RETRIES = 3
+REPLY_BACKOFF_SECONDS = 5
+
+# Comments written to the comment store per transaction during a first full sync
+STORE_BATCH_SIZE = 500
+
+_reply_limiter = RateLimiter(REPLY_REQUESTS_PER_SECOND)
+
+# Clients come from the shared pool (see clients) and pytube is imported on first use,
+# so importing this module stays cheap for the app's first render
 def start_youtube_service():
-    return build(api_server_name, api_version, developerKey=youtube_api_key)
+    """Context manager checking out a pooled YouTube client."""
+    return youtube_service()
 
 def extract_video_id_from_link(url):
+    from pytube import extract
     return extract.video_id(url)
 
-def get_comments_thread(youtube, video_id, next_page_token):
+def get_comments_thread(youtube, video_id, next_page_token, order="time"):
     results = youtube.commentThreads().list(
         part="snippet,replies",                     
         videoId=video_id,
         textFormat='plainText',
         maxResults=100,
+        order=order,
+        pageToken=next_page_token or None,
     ).execute()
+    # Every list call costs one YouTube Data API quota unit
+    get_metrics().inc("echopulse_api_quota_units_total", api="youtube")
     return results
 
+def iter_comment_pages(youtube, video_id, page_token=None, order="time"):
+    """Yield (threads, nextPageToken) for each page, starting at `page_token`, until exhausted."""
+    while True:
+        data = get_comments_thread(youtube, video_id, page_token, order=order)
+        page_token = data.get("nextPageToken")
+        yield data.get("items", []), page_token
+        if not page_token:
+            return
+
+def iter_comment_threads(youtube, video_id, max_threads=MAX_COMMENT_THREADS, order="time"):
+    """Yield comment threads page by page, following nextPageToken until exhausted or capped."""
+    fetched = 0
+    for threads, _ in iter_comment_pages(youtube, video_id, order=order):
+        for thread in threads:
+            yield thread
+            fetched += 1
+            if max_threads is not None and fetched >= max_threads:
+                return
+
+def get_video_comment_count(youtube, video_id):
+    """The video's public comment count (top-level comments and replies), or None when hidden."""
+    results = youtube.videos().list(part="statistics", id=video_id).execute()
+    get_metrics().inc("echopulse_api_quota_units_total", api="youtube")
+    items = results.get("items") or [{}]
+    count = items[0].get("statistics", {}).get("commentCount")
+    return int(count) if count is not None else None
+
+def get_comment_replies(youtube, parent_id):
+    """Fetch every reply under a top-level comment, following nextPageToken."""
+    replies = []
+    next_page_token = None
+    while True:
+        _reply_limiter.acquire()
+        results = youtube.comments().list(
+            part="snippet",
+            parentId=parent_id,
+            textFormat='plainText',
+            maxResults=100,
+            pageToken=next_page_token,
+        ).execute()
+        get_metrics().inc("echopulse_api_quota_units_total", api="youtube")
+        replies.extend(results.get("items", []))
+        next_page_token = results.get("nextPageToken")
+        if not next_page_token:
+            return replies
+
+def _needs_reply_expansion(thread):
+    total_replies = thread['snippet'].get('totalReplyCount', 0)
+    embedded_replies = len(thread.get('replies', {}).get('comments', []))
+    return total_replies > embedded_replies
+
+def _expand_thread(thread, quota_exhausted):
+    """Replace the embedded replies of `thread` with the full list, keeping them on failure."""
+    from googleapiclient.errors import HttpError
+    for _ in range(REPLY_RETRIES):
+        if quota_exhausted.is_set():
+            return thread
+        try:
+            with start_youtube_service() as youtube:
+                replies = get_comment_replies(youtube, thread['id'])
+        except HttpError as e:
+            if "quotaExceeded" in str(e):
+                quota_exhausted.set()
+            elif e.resp.status in (403, 429, 500, 503):
+                _reply_limiter.pause(REPLY_BACKOFF_SECONDS)
+                continue
+            return thread
+        thread['replies'] = {'comments': replies}
+        return thread
+    return thread
+
+def _resolve(item):
+    return item.result() if isinstance(item, Future) else item
+
+def expand_reply_threads(threads, max_workers=REPLY_WORKERS):
+    """Yield threads in order, fetching replies missing from the embedded set concurrently."""
+    quota_exhausted = threading.Event()
+    # Bound the look-ahead so a huge video doesn't queue every thread at once
+    window = max_workers * 4
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for thread in threads:
+            if _needs_reply_expansion(thread) and not quota_exhausted.is_set():
+                pending.append(pool.submit(_expand_thread, thread, quota_exhausted))
+            else:
+                pending.append(thread)
+            while pending and (len(pending) > window or not isinstance(pending[0], Future)):
+                yield _resolve(pending.popleft())
+        while pending:
+            yield _resolve(pending.popleft())
+
+def _to_comment(comment, reply_count=0):
+    snippet = comment['snippet']
+    return Comment(
+        comment['id'],
+        parent_id=snippet.get('parentId'),
+        author=snippet.get('authorDisplayName'),
+        text=snippet['textOriginal'],
+        like_count=snippet.get('likeCount', 0),
+        reply_count=reply_count,
+        published_at=snippet.get('publishedAt'),
+    )
+
+def thread_to_comments(thread):
+    """Flatten a comment thread into Comment records: the top-level comment, then its replies."""
+    comments = [_to_comment(thread['snippet']['topLevelComment'], thread['snippet'].get('totalReplyCount', 0))]
+    for reply in thread.get('replies', {}).get('comments', []):
+        comments.append(_to_comment(reply))
+    return comments
+
 def load_comments_in_format(comments):
-    all_comments_string = ""
-    for thread in comments["items"]:
-        comment_content = thread['snippet']['topLevelComment']['snippet']['textOriginal']
-        all_comments_string += comment_content + "\n"
-        if 'replies' in thread:
-            for reply in thread['replies']['comments']:
-                reply_text = reply['snippet']['textOriginal']
-                all_comments_string += reply_text + "\n"
-    return all_comments_string
-
-def fetch_comments(url):
-    youtube = start_youtube_service()
+    """Build a CommentCorpus from a commentThreads response or an iterable of threads."""
+    threads = comments["items"] if isinstance(comments, dict) else comments
+    corpus = CommentCorpus()
+    for thread in threads:
+        corpus.extend(thread_to_comments(thread))
+    return corpus
+
+def _sync_pass(youtube, video_id, store, page_token, is_delta, max_threads):
+    """Store threads newest first from `page_token`; return (added, newest comment, resume token, threads read).
+
+    A delta pass stops at the first thread already stored. A pass that reaches `max_threads`
+    stops at the end of a page and returns the next page's token, so the gap can be filled later.
+    """
+    cursor = {"resume": None, "threads": 0}
+
+    def threads():
+        for page, next_token in iter_comment_pages(youtube, video_id, page_token, order="time"):
+            for thread in page:
+                if is_delta and store.has_comment("youtube", video_id, thread['id']):
+                    return
+                cursor["threads"] += 1
+                yield thread
+            if next_token and max_threads is not None and cursor["threads"] >= max_threads:
+                cursor["resume"] = next_token
+                return
+
+    added = []
+    pending = []
+    newest = None
+    for thread in expand_reply_threads(threads()):
+        if newest is None:
+            newest = thread['snippet']['topLevelComment']
+        pending.extend(thread_to_comments(thread))
+        # A delta is only written once complete; a partial one would make the next refresh stop early
+        if not is_delta and len(pending) >= STORE_BATCH_SIZE:
+            added.extend(store.add_comments("youtube", video_id, pending))
+            pending = []
+    added.extend(store.add_comments("youtube", video_id, pending))
+    return added, newest, cursor["resume"], cursor["threads"]
+
+def sync_video_comments(youtube, video_id, store, max_threads=MAX_COMMENT_THREADS):
+    """Bring the stored comments for a video up to date and return the newly stored comments.
+
+    The first sync pulls every thread. Later syncs walk threads newest first and stop at
+    the first thread already stored, so only the delta costs quota; new replies on threads
+    that were already stored are not picked up by a delta refresh. A sync that hits
+    `max_threads` records where it stopped, and the next sync fills that gap before looking
+    for newer threads, so at most one gap is ever outstanding.
+    """
+    state = store.sync_state("youtube", video_id)
+    added = []
+    if state is not None and state[3]:
+        # Fill the gap below the previous capped sync (down to the threads stored before it)
+        gap_added, _, resume, gap_threads = _sync_pass(youtube, video_id, store, state[3], True, max_threads)
+        added.extend(gap_added)
+        store.mark_synced("youtube", video_id, resume_token=resume)
+        if resume is not None:
+            return added
+        if max_threads is not None:
+            max_threads -= gap_threads
+            if max_threads <= 0:
+                return added
+
+    head_added, newest, resume, _ = _sync_pass(youtube, video_id, store, None, state is not None, max_threads)
+    added.extend(head_added)
+    if newest is None:
+        store.mark_synced("youtube", video_id)
+    else:
+        store.mark_synced("youtube", video_id, newest['id'], newest['snippet'].get('publishedAt'), resume_token=resume)
+    return added
+
+def fetch_comments(url, max_threads=MAX_COMMENT_THREADS, store=None, sample=False):
+    """Return (corpus, total) for a video, synced through the comment store; raises FetchError on API errors.
+
+    `total` is how many comments the video has: len(corpus), except when with `sample` and
+    nothing stored for the video yet only the SAMPLE_MAX_THREADS most relevant threads are
+    fetched, without reply expansion. Then nothing is stored (a partial first sync would make
+    later refreshes treat the video as fully stored) and `total` is the video's comment count.
+    Pages are streamed into the store, but the corpus is only returned once the sync is done:
+    near-duplicate collapsing, sampling and coverage all need every comment in view.
+    """
+    from googleapiclient.errors import HttpError
     video_id = extract_video_id_from_link(url)
-    next_page_token = ''
-    
+    store = store or get_comment_store()
+    metrics = get_metrics()
+
     try:
-        data = get_comments_thread(youtube, video_id, next_page_token)
-        all_comments = load_comments_in_format(data)
-        return all_comments
+        with metrics.timer("youtube_fetch"), start_youtube_service() as youtube:
+            if sample and store.sync_state("youtube", video_id) is None:
+                corpus = load_comments_in_format(
+                    iter_comment_threads(youtube, video_id, max_threads=SAMPLE_MAX_THREADS, order="relevance")
+                )
+                total = max(len(corpus), get_video_comment_count(youtube, video_id) or 0)
+            else:
+                sync_video_comments(youtube, video_id, store, max_threads=max_threads)
+                corpus = CommentCorpus(store.load_comments("youtube", video_id))
+                total = len(corpus)
+        metrics.inc("echopulse_comments_processed_total", len(corpus), stage="youtube_fetch")
+        return corpus, total
     except HttpError as e:
         error_message = str(e)
         if "commentsDisabled" in error_message:
-            st.error("The video has disabled comments. Please try with another video.")
-        else:
-            st.error(f"An error occurred: {error_message}")
-        return None
\ No newline at end of file
+            raise FetchError("The video has disabled comments. Please try with another video.", permanent=True) from e
+        if "videoNotFound" in error_message:
+            raise FetchError("Video not found. Please check the URL and try again.", permanent=True) from e
+        raise FetchError(f"YouTube API error: {error_message}") from e
\ No newline at end of file
@@ -0,0 +1,127 @@
+import hashlib
+import re
+import string
+import unicodedata
+from records import Comment, CommentCorpus
+
+# SimHash parameters: 64-bit signatures over words and word pairs, split into bands for lookup.
+# With BANDS > MAX_HAMMING_DISTANCE, any pair within the distance shares at least one band.
+BANDS = 4
+MAX_HAMMING_DISTANCE = 3
+# Shorter normalized texts ("first", "🔥🔥") are only collapsed on exact matches
+MIN_SIMHASH_WORDS = 5
+# Candidates compared per band bucket, so a flood of one template stays linear
+MAX_BUCKET_CANDIDATES = 8
+SIMHASH_BATCH = 2000
+
+_BAND_BITS = 64 // BANDS
+_BAND_MASK = (1 << _BAND_BITS) - 1
+_URL = re.compile(r"https?://\S+")
+_REPEATED_CHAR = re.compile(r"(.)\1{2,}")
+_WHITESPACE = re.compile(r"\s+")
+_PUNCTUATION = str.maketrans("", "", string.punctuation)
+
+
+def normalize_comment(text):
+    """Lowercase, drop URLs and ASCII punctuation, squeeze repeated characters and whitespace."""
+    text = unicodedata.normalize("NFKC", text).lower()
+    text = _URL.sub(" ", text).translate(_PUNCTUATION)
+    text = _REPEATED_CHAR.sub(r"\1\1", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def _stable_hash(feature):
+    """8-byte digest of a feature; unlike hash(), the same in every process and run."""
+    return hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+
+
+def simhash_signatures(texts):
+    """Return 64-bit SimHash signatures over the words and adjacent word pairs of each text."""
+    import numpy as np
+    signatures = []
+    # Features repeat heavily across comments, so each distinct one is hashed once per call
+    feature_hashes = {}
+
+    def stable_hash(feature):
+        digest = feature_hashes.get(feature)
+        if digest is None:
+            digest = feature_hashes[feature] = _stable_hash(feature)
+        return digest
+
+    for start in range(0, len(texts), SIMHASH_BATCH):
+        hashes, offsets = [], []
+        for text in texts[start:start + SIMHASH_BATCH]:
+            offsets.append(len(hashes))
+            words = text.split() or [text]
+            hashes.extend(map(stable_hash, words))
+            hashes.extend(stable_hash(f"{first}\0{second}") for first, second in zip(words, words[1:]))
+        shingle_bits = np.unpackbits(
+            np.frombuffer(b"".join(hashes), dtype=np.uint8).reshape(-1, 8), axis=1, bitorder="little"
+        )
+        # A signature bit is set when most of the text's features have it set
+        ones = np.add.reduceat(shingle_bits, offsets, axis=0, dtype=np.int32)
+        lengths = np.diff(np.append(offsets, len(hashes)))
+        majority = np.packbits(ones * 2 > lengths[:, None], axis=1, bitorder="little")
+        signatures.extend(int(signature) for signature in majority.view(np.uint64).ravel())
+    return signatures
+
+
+def _hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+def collapse_near_duplicates(comments, max_distance=MAX_HAMMING_DISTANCE):
+    """Collapse exact and near-duplicate comments into representatives carrying a multiplicity.
+
+    Each representative is a copy of the first comment of its group, with `multiplicity`
+    set to the group size and `like_count` summed over the group.
+    """
+    groups = {}
+    for comment in comments:
+        key = normalize_comment(comment.text)
+        group = groups.get(key)
+        if group is None:
+            groups[key] = [comment]
+        else:
+            group.append(comment)
+
+    keys = list(groups)
+    near_keys = [key for key in keys if key.count(" ") + 1 >= MIN_SIMHASH_WORDS]
+    signatures = dict(zip(near_keys, simhash_signatures(near_keys)))
+
+    merged_into = {}
+    bands = [{} for _ in range(BANDS)]
+    for key in near_keys:
+        signature = signatures[key]
+        band_values = [(signature >> (band * _BAND_BITS)) & _BAND_MASK for band in range(BANDS)]
+        target = None
+        seen = set()
+        for band, value in enumerate(band_values):
+            for candidate in bands[band].get(value, ())[:MAX_BUCKET_CANDIDATES]:
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                if _hamming(signature, signatures[candidate]) <= max_distance:
+                    target = candidate
+                    break
+            if target is not None:
+                break
+        if target is not None:
+            merged_into[key] = target
+            continue
+        for band, value in enumerate(band_values):
+            bands[band].setdefault(value, []).append(key)
+
+    for key, target in merged_into.items():
+        groups[target].extend(groups.pop(key))
+
+    representatives = []
+    for key in keys:
+        members = groups.get(key)
+        if not members:
+            continue
+        representative = Comment(*members[0].as_tuple())
+        representative.multiplicity = len(members)
+        representative.like_count = sum(member.like_count for member in members)
+        representatives.append(representative)
+    return CommentCorpus(representatives)
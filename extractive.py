@@ -0,0 +1,151 @@
+import html
+import math
+from records import CommentCorpus
+from topics import STOPWORDS, WORD_PATTERN
+
+# Comments quoted by the extractive summary
+EXTRACT_COUNT = 7
+# Shorter comments can still rank, but are not quoted on their own
+EXTRACT_MIN_WORDS = 5
+EXTRACT_MAX_CHARS = 300
+# Skip a candidate this similar (cosine) to one already quoted
+REDUNDANCY_THRESHOLD = 0.6
+DAMPING = 0.85
+MAX_ITERATIONS = 50
+TOLERANCE = 1e-6
+# Token budget kept by the pre-filter in front of the Gemini summarizer
+PREFILTER_TOKEN_BUDGET = 60000
+
+
+def tfidf_matrix(texts):
+    """Sparse (n, vocabulary) TF-IDF matrix with sublinear term frequency and unit-length rows."""
+    import numpy as np
+    from scipy import sparse
+
+    vocabulary = {}
+    indices, indptr = [], [0]
+    for text in texts:
+        indices.extend(
+            vocabulary.setdefault(word, len(vocabulary))
+            for word in WORD_PATTERN.findall(text.lower()) if word not in STOPWORDS
+        )
+        indptr.append(len(indices))
+    counts = sparse.csr_matrix(
+        (np.ones(len(indices), dtype=np.float64), indices, indptr), shape=(len(texts), max(1, len(vocabulary)))
+    )
+    counts.sum_duplicates()
+    counts.data = 1.0 + np.log(counts.data)
+    document_frequency = np.bincount(counts.indices, minlength=counts.shape[1])
+    idf = np.log((1 + len(texts)) / (1 + document_frequency)) + 1.0
+    matrix = counts.multiply(idf[np.newaxis, :]).tocsr()
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    return sparse.diags(np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)) @ matrix
+
+
+def textrank_scores(matrix, teleport):
+    """PageRank over the cosine-similarity graph of the rows of `matrix`.
+
+    The n x n similarity matrix W = X X^T is never built: each power iteration applies it as
+    X (X^T v), two sparse products costing O(nonzeros), minus the self-similarity diagonal.
+    """
+    import numpy as np
+
+    n = matrix.shape[0]
+    self_similarity = np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel()
+    degree = matrix @ (matrix.T @ np.ones(n)) - self_similarity
+    connected = degree > 1e-12
+    inverse_degree = np.divide(1.0, degree, out=np.zeros(n), where=connected)
+    teleport = teleport / teleport.sum()
+    scores = teleport.copy()
+    for _ in range(MAX_ITERATIONS):
+        spread = scores * inverse_degree
+        updated = (1 - DAMPING) * teleport + DAMPING * (matrix @ (matrix.T @ spread) - self_similarity * spread)
+        # Comments sharing no words with any other hand their rank back through the teleport vector
+        updated += DAMPING * scores[~connected].sum() * teleport
+        converged = np.abs(updated - scores).sum() < TOLERANCE
+        scores = updated
+        if converged:
+            break
+    return scores
+
+
+def rank_comments(comments):
+    """Return (TF-IDF matrix, TextRank score per comment); duplicates and liked comments weigh more."""
+    import numpy as np
+
+    matrix = tfidf_matrix(comments.texts)
+    teleport = np.array([
+        comment.multiplicity * (1.0 + math.log1p(comment.like_count)) for comment in comments
+    ])
+    return matrix, textrank_scores(matrix, teleport)
+
+
+def extract_comments(comments, count=EXTRACT_COUNT):
+    """Return the `count` most central comments, best first, skipping near-repeats of earlier picks."""
+    import numpy as np
+
+    comments = comments if isinstance(comments, CommentCorpus) else CommentCorpus(comments)
+    if not len(comments):
+        return []
+    matrix, scores = rank_comments(comments)
+    order = np.argsort(-scores)
+
+    def pick(min_words):
+        chosen = []
+        for index in order:
+            if len(chosen) == count:
+                break
+            if len(comments[index].text.split()) < min_words:
+                continue
+            if chosen and (matrix[chosen] @ matrix[index].T).max() > REDUNDANCY_THRESHOLD:
+                continue
+            chosen.append(int(index))
+        return chosen
+
+    # Threads of one-liners still get quoted
+    chosen = pick(EXTRACT_MIN_WORDS) or pick(0)
+    return [comments[index] for index in chosen]
+
+
+def extractive_summary(comments, count=EXTRACT_COUNT):
+    """Markdown list quoting the most representative comments; no LLM involved.
+
+    Comment text is HTML-escaped: the app renders summaries with HTML enabled.
+    """
+    picked = extract_comments(comments, count)
+    if not picked:
+        return "No comments to summarize."
+    lines = []
+    for comment in picked:
+        text = " ".join(comment.text.split())
+        if len(text) > EXTRACT_MAX_CHARS:
+            text = text[:EXTRACT_MAX_CHARS].rsplit(" ", 1)[0] + "…"
+        repeated = f" (×{comment.multiplicity})" if comment.multiplicity > 1 else ""
+        lines.append(f"- “{html.escape(text)}”{repeated}")
+    return "\n".join(lines)
+
+
+def prefilter(comments, token_budget=PREFILTER_TOKEN_BUDGET):
+    """Keep the highest-ranked comments that fit `token_budget`, in their original order.
+
+    Returns (corpus, coverage) like sampling.sample_by_token_budget: the kept comments and the
+    fraction of the original comments (counting collapsed duplicates) they represent.
+    """
+    import numpy as np
+
+    comments = comments if isinstance(comments, CommentCorpus) else CommentCorpus(comments)
+    token_counts = comments.token_counts
+    # +1 per comment for the newline separator
+    if sum(token_counts) + len(comments) <= token_budget:
+        return comments, 1.0
+    _, scores = rank_comments(comments)
+    kept = []
+    budget = token_budget
+    for index in np.argsort(-scores):
+        cost = token_counts[index] + 1
+        if cost <= budget:
+            kept.append(int(index))
+            budget -= cost
+    kept.sort()
+    corpus = CommentCorpus(comments[index] for index in kept)
+    return corpus, corpus.total_multiplicity / comments.total_multiplicity
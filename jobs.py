@@ -0,0 +1,164 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from metrics import get_metrics
+
+JOB_WORKERS = 4
+# Finished jobs stay available this long so every session polling them can read the result
+JOB_RETENTION_SECONDS = 600
+# Pipeline stages in order, as reported through Job.report
+PIPELINE_STAGES = ("fetched", "chunked", "mapped", "reduced")
+
+
+class Job:
+    """A background analysis with its status, per-stage progress and result or error."""
+
+    def __init__(self, key):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.status = "queued"
+        self.stage = None
+        self.message = None
+        # stage -> (done, total); either may be None when unknown
+        self.progress = {}
+        # stage -> time of its latest report, i.e. when it finished once the job is done
+        self.reported_at = {}
+        # Summary text streamed so far, and chunk summaries by index as the map phase finishes them
+        self.output = []
+        self.partials = {}
+        self.result = None
+        self.error = None
+        # Set when the result came from the result cache: when it was computed, and the id of the
+        # job refreshing it if it was stale
+        self.cached_at = None
+        self.refresh_id = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self._done = threading.Event()
+
+    def report(self, stage, done=None, total=None, message=None):
+        """Record progress for a stage; safe to call from any thread."""
+        self.progress[stage] = (done, total)
+        self.reported_at[stage] = time.time()
+        self.stage = stage
+        self.message = message
+
+    def stream(self, piece):
+        """Append a streamed piece of the summary text."""
+        self.output.append(piece)
+
+    def add_partial(self, index, summary):
+        self.partials[index] = summary
+
+    @property
+    def output_text(self):
+        return "".join(self.output)
+
+    def stage_timings(self):
+        """Seconds spent in each reported stage, in pipeline order, measured from job creation."""
+        timings = {}
+        previous = self.created_at
+        for stage in PIPELINE_STAGES:
+            if stage in self.reported_at:
+                timings[stage] = self.reported_at[stage] - previous
+                previous = self.reported_at[stage]
+        return timings
+
+    @property
+    def finished(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Block until the job finishes or `timeout` elapses; return whether it finished."""
+        return self._done.wait(timeout)
+
+
+class JobManager:
+    """Bounded background executor for analyses; identical in-flight submissions share one job."""
+
+    def __init__(self, max_workers=JOB_WORKERS, retention_seconds=JOB_RETENTION_SECONDS, cache=None):
+        self.retention_seconds = retention_seconds
+        self.cache = cache
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="echopulse-job")
+        self._jobs = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key, fn, *args, **kwargs):
+        """Run fn(job, *args, **kwargs) in the background and return the job id.
+
+        While a job with the same `key` is queued or running, its id is returned instead.
+        """
+        with self._lock:
+            self._prune()
+            job_id = self._inflight.get(key)
+            if job_id is not None:
+                return job_id
+            job = Job(key)
+            self._jobs[job.id] = job
+            self._inflight[key] = job.id
+        self._pool.submit(self._run, job, fn, args, kwargs)
+        return job.id
+
+    def submit_cached(self, key, fn, *args, **kwargs):
+        """Like submit, but answer from the result cache when it holds a result for `key`.
+
+        A fresh result comes back as an already finished job. A stale one does too, while a
+        background job recomputes it (stale-while-revalidate); on a miss the job runs normally.
+        Complete results are written back to the cache either way.
+        """
+        if self.cache is None:
+            return self.submit(key, fn, *args, **kwargs)
+        cached = self.cache.get(key)
+        if cached is None:
+            get_metrics().inc("echopulse_result_cache_total", outcome="miss")
+            return self.submit(key, self._caching(fn), *args, **kwargs)
+        result, created_at = cached
+        job = Job(key)
+        job.result = result
+        job.cached_at = created_at
+        if self.cache.is_fresh(created_at):
+            get_metrics().inc("echopulse_result_cache_total", outcome="hit")
+        else:
+            get_metrics().inc("echopulse_result_cache_total", outcome="stale")
+            job.refresh_id = self.submit(key, self._caching(fn), *args, **kwargs)
+        job.status = "done"
+        job.finished_at = time.time()
+        job._done.set()
+        with self._lock:
+            self._jobs[job.id] = job
+        return job.id
+
+    def _caching(self, fn):
+        def run(job, *args, **kwargs):
+            result = fn(job, *args, **kwargs)
+            # None means nothing was fetched, and an incomplete result (cut short by a rate limit)
+            # would stand in for the full one; both are worth computing again next time
+            if result is not None and result.get("complete", True):
+                self.cache.put(job.key, result)
+            return result
+        return run
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job, fn, args, kwargs):
+        job.status = "running"
+        try:
+            job.result = fn(job, *args, **kwargs)
+            job.status = "done"
+        except Exception as e:
+            job.error = str(e) or type(e).__name__
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self._inflight.pop(job.key, None)
+            job._done.set()
+
+    def _prune(self):
+        cutoff = time.time() - self.retention_seconds
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.finished and job.finished_at < cutoff]:
+            del self._jobs[job_id]
@@ -0,0 +1,120 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# On-disk location of the LLM response cache (override with ECHOPULSE_LLM_CACHE)
+LLM_CACHE_PATH = os.getenv("ECHOPULSE_LLM_CACHE", os.path.join(".echopulse", "llm_cache.sqlite3"))
+LLM_CACHE_MAX_BYTES = 64 * 1024 * 1024
+LLM_CACHE_TTL_SECONDS = 7 * 24 * 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS llm_cache_last_access ON llm_cache (last_access);
+"""
+
+
+class LLMCache:
+    """Disk-backed LLM response cache keyed by a hash of (model, prompt, text), with LRU eviction and TTL."""
+
+    def __init__(self, path=LLM_CACHE_PATH, max_bytes=LLM_CACHE_MAX_BYTES, ttl_seconds=LLM_CACHE_TTL_SECONDS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def make_key(model, prompt, text):
+        digest = hashlib.sha256()
+        for part in (model, prompt, text):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _count(self, hit):
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key):
+        """Return the cached value for `key`, or None on a miss or expired entry."""
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[1] > self.ttl_seconds:
+                conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                row = None
+            if row is not None:
+                conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+        self._count(row is not None)
+        return row[0] if row is not None else None
+
+    def put(self, key, value):
+        """Store `value`, then evict least recently used entries beyond max_bytes."""
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now),
+            )
+            conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                "SELECT key FROM (SELECT key, SUM(size) OVER (ORDER BY last_access DESC) AS running FROM llm_cache) "
+                "WHERE running > ?)",
+                (self.max_bytes,),
+            )
+
+    def stats(self):
+        """Return hit/miss counters for this process plus the current size of the cache."""
+        with self._connect() as conn:
+            entries, total_bytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": entries,
+                "bytes": total_bytes,
+            }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """Return the process-wide LLMCache, creating it on first use."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = LLMCache()
+        return _default_cache
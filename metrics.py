@@ -0,0 +1,129 @@
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the stage latency histogram buckets
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# name -> (type, help) for every metric the app records
+METRICS = {
+    "echopulse_stage_seconds": ("histogram", "Time spent in each pipeline stage."),
+    "echopulse_fetched_bytes_total": ("counter", "Response bytes received from the comment APIs."),
+    "echopulse_comments_processed_total": ("counter", "Comments handled by each pipeline stage."),
+    "echopulse_llm_calls_total": ("counter", "Gemini calls made, by summarize phase."),
+    "echopulse_llm_tokens_total": ("counter", "Gemini tokens sent and received."),
+    "echopulse_api_quota_units_total": ("counter", "API quota consumed: YouTube Data API units, X requests."),
+    "echopulse_emails_total": ("counter", "Contact form emails handled by the outbox sender, by status (sent, failed)."),
+    "echopulse_result_cache_total": ("counter", "Result cache lookups for submitted analyses, by outcome (hit, stale, miss)."),
+}
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Metrics:
+    """Thread-safe in-process counters and latency histograms with a Prometheus text export."""
+
+    def __init__(self):
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, seconds, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {"buckets": [0] * len(LATENCY_BUCKETS), "count": 0, "sum": 0.0}
+            index = bisect.bisect_left(LATENCY_BUCKETS, seconds)
+            if index < len(LATENCY_BUCKETS):
+                histogram["buckets"][index] += 1
+            histogram["count"] += 1
+            histogram["sum"] += seconds
+
+    @contextmanager
+    def timer(self, stage):
+        """Record the time spent in the block under echopulse_stage_seconds{stage=...}."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("echopulse_stage_seconds", time.perf_counter() - start, stage=stage)
+
+    def stage_summary(self):
+        """Return {stage: (calls, total_seconds)} for the diagnostics panel."""
+        with self._lock:
+            return {
+                dict(labels)["stage"]: (histogram["count"], histogram["sum"])
+                for (name, labels), histogram in self._histograms.items()
+                if name == "echopulse_stage_seconds"
+            }
+
+    def counter_values(self):
+        """Return [(name, labels_dict, value)] sorted by name and labels."""
+        with self._lock:
+            return [(name, dict(labels), value) for (name, labels), value in sorted(self._counters.items())]
+
+    def to_prometheus(self):
+        """Render every recorded metric in the Prometheus text exposition format."""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, dict(value, buckets=list(value["buckets"]))) for key, value in self._histograms.items())
+        lines = []
+        for metric, (kind, help_text) in METRICS.items():
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"]
+            if kind == "counter":
+                for (name, labels), value in counters:
+                    if name == metric:
+                        lines.append(f"{name}{_format_labels(labels)} {value}")
+                continue
+            for (name, labels), histogram in histograms:
+                if name != metric:
+                    continue
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS, histogram["buckets"]):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {histogram['count']}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {histogram['sum']:.6f}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Write the export to `path` atomically, e.g. for node_exporter's textfile collector."""
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(temporary, path)
+
+
+_default_metrics = None
+_default_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    """Return the process-wide Metrics registry."""
+    global _default_metrics
+    with _default_metrics_lock:
+        if _default_metrics is None:
+            _default_metrics = Metrics()
+        return _default_metrics
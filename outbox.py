@@ -0,0 +1,309 @@
+import os
+import smtplib
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from email.message import EmailMessage
+from metrics import get_metrics
+
+# On-disk location of the email outbox (override with ECHOPULSE_OUTBOX)
+OUTBOX_PATH = os.getenv("ECHOPULSE_OUTBOX", os.path.join(".echopulse", "outbox.sqlite3"))
+# Messages sent over one connection before the sender checks the queue again
+OUTBOX_BATCH_SIZE = 20
+# Failed sends are retried with exponential backoff, then left in the outbox marked failed
+OUTBOX_MAX_ATTEMPTS = 6
+OUTBOX_RETRY_BASE_SECONDS = 30
+# Longest wait between queue checks when nothing wakes the sender
+OUTBOX_POLL_SECONDS = 60
+# An idle SMTP connection is closed after this long rather than left for the server to drop
+SMTP_IDLE_SECONDS = 120
+SMTP_TIMEOUT_SECONDS = 30
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    recipient TEXT NOT NULL,
+    reply_to TEXT,
+    subject TEXT NOT NULL,
+    body TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    sent_at REAL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (sent_at, next_attempt_at);
+"""
+
+
+def _as_bool(value):
+    """Secrets may hold real booleans or strings such as "false" and "0"."""
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+
+class SMTPSettings:
+    """Where and how the sender connects; read from Streamlit secrets by `from_secrets`."""
+
+    def __init__(self, host, port=587, username=None, password=None, starttls=True, use_ssl=False,
+                 sender=None, recipient=None):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.use_ssl = use_ssl
+        self.sender = sender or username
+        self.recipient = recipient or self.sender
+
+    def missing(self):
+        """Names of the secrets still needed before mail can be sent; empty when configured."""
+        missing = []
+        if not self.host:
+            missing.append("SMTP_HOST")
+        if not self.sender:
+            missing.append("CONTACT_SENDER or SMTP_USERNAME")
+        if not self.recipient:
+            missing.append("CONTACT_RECIPIENT")
+        return missing
+
+    @classmethod
+    def from_secrets(cls):
+        """SMTP_HOST, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD, SMTP_STARTTLS, SMTP_SSL, CONTACT_SENDER, CONTACT_RECIPIENT."""
+        import streamlit as st
+
+        secrets = st.secrets
+        return cls(
+            host=secrets.get("SMTP_HOST", "smtp.gmail.com"),
+            port=int(secrets.get("SMTP_PORT", 587)),
+            username=secrets.get("SMTP_USERNAME"),
+            password=secrets.get("SMTP_PASSWORD"),
+            starttls=_as_bool(secrets.get("SMTP_STARTTLS", True)),
+            use_ssl=_as_bool(secrets.get("SMTP_SSL", False)),
+            sender=secrets.get("CONTACT_SENDER"),
+            recipient=secrets.get("CONTACT_RECIPIENT"),
+        )
+
+
+class EmailOutbox:
+    """SQLite-backed queue of outgoing email; a message stays until it is sent or out of attempts."""
+
+    def __init__(self, path=OUTBOX_PATH, max_attempts=OUTBOX_MAX_ATTEMPTS, retry_base_seconds=OUTBOX_RETRY_BASE_SECONDS):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def enqueue(self, subject, body, recipient=None, reply_to=None):
+        """Store a message for the sender and return its id; `recipient` None means the configured one."""
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO outbox (recipient, reply_to, subject, body, created_at, next_attempt_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (recipient or "", reply_to, subject, body, now, now),
+            )
+            return cursor.lastrowid
+
+    def due(self, limit=OUTBOX_BATCH_SIZE):
+        """Return up to `limit` unsent messages ready for an attempt, oldest first, as dicts."""
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(
+                "SELECT id, recipient, reply_to, subject, body, attempts FROM outbox "
+                "WHERE sent_at IS NULL AND attempts < ? AND next_attempt_at <= ? "
+                "ORDER BY next_attempt_at, id LIMIT ?",
+                (self.max_attempts, time.time(), limit),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def mark_sent(self, message_id):
+        with self._connect() as conn:
+            conn.execute("UPDATE outbox SET sent_at = ?, last_error = NULL WHERE id = ?", (time.time(), message_id))
+
+    def mark_failed(self, message_id, error):
+        """Count a failed attempt and schedule the next one with exponential backoff."""
+        with self._connect() as conn:
+            attempts = conn.execute("SELECT attempts FROM outbox WHERE id = ?", (message_id,)).fetchone()[0] + 1
+            conn.execute(
+                "UPDATE outbox SET attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+                (attempts, time.time() + self.retry_base_seconds * 2 ** (attempts - 1), str(error), message_id),
+            )
+
+    def mark_undeliverable(self, message_id, error):
+        """Give up on a message that can never be sent, without further attempts."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE outbox SET attempts = MAX(attempts, ?), last_error = ? WHERE id = ?",
+                (self.max_attempts, str(error), message_id),
+            )
+
+    def next_attempt_at(self):
+        """Earliest time a pending message becomes due, or None when nothing is pending."""
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT MIN(next_attempt_at) FROM outbox WHERE sent_at IS NULL AND attempts < ?",
+                (self.max_attempts,),
+            ).fetchone()[0]
+
+    def counts(self):
+        """Return {"pending": n, "sent": n, "failed": n}."""
+        with self._connect() as conn:
+            sent, pending, failed = conn.execute(
+                "SELECT COALESCE(SUM(sent_at IS NOT NULL), 0), "
+                "COALESCE(SUM(sent_at IS NULL AND attempts < ?), 0), "
+                "COALESCE(SUM(sent_at IS NULL AND attempts >= ?), 0) FROM outbox",
+                (self.max_attempts, self.max_attempts),
+            ).fetchone()
+        return {"pending": pending, "sent": sent, "failed": failed}
+
+
+class OutboxSender:
+    """Background thread that drains an EmailOutbox over one reused, authenticated SMTP connection.
+
+    The connection is opened on the first due message, kept across batches, checked with NOOP
+    before reuse, and closed after SMTP_IDLE_SECONDS without traffic. A failed send drops the
+    connection (it may be the cause) and reschedules just that message.
+    """
+
+    def __init__(self, outbox, settings, batch_size=OUTBOX_BATCH_SIZE, poll_seconds=OUTBOX_POLL_SECONDS,
+                 idle_seconds=SMTP_IDLE_SECONDS):
+        self.outbox = outbox
+        self.settings = settings
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.idle_seconds = idle_seconds
+        self._connection = None
+        self._last_used = 0.0
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="email-outbox", daemon=True)
+            self._thread.start()
+        return self
+
+    def notify(self):
+        """Wake the sender after enqueueing instead of waiting for the next poll."""
+        self._wake.set()
+
+    def stop(self, timeout=None):
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._close()
+
+    def _open(self):
+        settings = self.settings
+        if settings.use_ssl:
+            connection = smtplib.SMTP_SSL(settings.host, settings.port, timeout=SMTP_TIMEOUT_SECONDS)
+        else:
+            connection = smtplib.SMTP(settings.host, settings.port, timeout=SMTP_TIMEOUT_SECONDS)
+            if settings.starttls:
+                connection.starttls()
+        if settings.username:
+            connection.login(settings.username, settings.password)
+        return connection
+
+    def _connect(self):
+        if self._connection is not None:
+            try:
+                self._connection.noop()
+            except smtplib.SMTPException:
+                self._close()
+        if self._connection is None:
+            self._connection = self._open()
+        return self._connection
+
+    def _close(self):
+        if self._connection is None:
+            return
+        try:
+            self._connection.quit()
+        except (smtplib.SMTPException, OSError):
+            self._connection.close()
+        self._connection = None
+
+    def _build(self, row):
+        message = EmailMessage()
+        message["From"] = self.settings.sender
+        message["To"] = row["recipient"] or self.settings.recipient
+        message["Subject"] = row["subject"]
+        if row["reply_to"]:
+            message["Reply-To"] = row["reply_to"]
+        message.set_content(row["body"])
+        return message
+
+    def send_due(self):
+        """Send one batch of due messages; returns how many were sent."""
+        sent = 0
+        for row in self.outbox.due(self.batch_size):
+            try:
+                message = self._build(row)
+            except Exception as e:
+                # A message that cannot be built (e.g. a header with a line break) fails the same way every time
+                self.outbox.mark_undeliverable(row["id"], e)
+                get_metrics().inc("echopulse_emails_total", status="failed")
+                continue
+            try:
+                self._connect().send_message(message)
+            except Exception as e:
+                # Most failures leave the connection in an unknown state; start the next send afresh
+                self._close()
+                self.outbox.mark_failed(row["id"], e)
+                get_metrics().inc("echopulse_emails_total", status="failed")
+                continue
+            self._last_used = time.time()
+            self.outbox.mark_sent(row["id"])
+            get_metrics().inc("echopulse_emails_total", status="sent")
+            sent += 1
+        return sent
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.clear()
+            try:
+                # A full batch may mean more are waiting
+                if self.send_due() == self.batch_size:
+                    continue
+                next_due = self.outbox.next_attempt_at()
+            except sqlite3.Error:
+                next_due = None
+            if self._connection is not None and time.time() - self._last_used >= self.idle_seconds:
+                self._close()
+            wait = self.poll_seconds if next_due is None else min(self.poll_seconds, max(0.0, next_due - time.time()))
+            if self._connection is not None:
+                wait = min(wait, max(0.0, self._last_used + self.idle_seconds - time.time()))
+            self._wake.wait(wait)
+
+
+_default_outbox = None
+_default_outbox_lock = threading.Lock()
+
+
+def get_outbox():
+    """Return the process-wide EmailOutbox, creating it on first use."""
+    global _default_outbox
+    with _default_outbox_lock:
+        if _default_outbox is None:
+            _default_outbox = EmailOutbox()
+        return _default_outbox
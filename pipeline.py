@@ -0,0 +1,110 @@
+from comments import fetch_comments
+from dedup import collapse_near_duplicates
+from extractive import extractive_summary, prefilter
+from sampling import sample_by_token_budget
+from topics import cluster_topics
+from twitter_comments import categorize_replies, fetch_tweet_replies, initialize_twitter_client_v2, summarize_replies
+from utils import get_summary, summarize_topics
+
+# Analysis pipelines run by the background job queue and the batch CLI. Each takes the Job first
+# so it can report per-stage progress, and returns a plain dict (None when there were no comments).
+# Fetch failures raise clients.FetchError, which the job records as its error: these run on worker
+# threads, where st.error would show nothing.
+# CPU-bound steps go to the `cpu` executor when one is given (the batch CLI's process pool).
+# With mode="topics" comments are clustered locally and only each topic's representatives go to Gemini;
+# mode="extractive" quotes the most central comments (TextRank) without calling Gemini at all, and
+# YouTube's mode="prefilter" sends Gemini only the top-ranked comments that fit a token budget.
+
+
+def _run_cpu(cpu, fn, *args, **kwargs):
+    if cpu is None:
+        return fn(*args, **kwargs)
+    return cpu.submit(fn, *args, **kwargs).result()
+
+
+def _summarize_by_topic(job, comments, cpu):
+    """Return (summary, topics for display, tokens sent, tokens in the full corpus)."""
+    topics = _run_cpu(cpu, cluster_topics, comments)
+    summary, topic_summaries = summarize_topics(
+        topics, on_progress=job.report, on_token=job.stream, on_partial=job.add_partial,
+    )
+    sent_tokens = sum(sum(topic["representatives"].token_counts) for topic in topics)
+    display = [
+        {"label": topic["label"], "size": topic["size"], "share": topic["share"], "summary": topic_summary}
+        for topic, topic_summary in zip(topics, topic_summaries)
+    ]
+    return summary, display, sent_tokens, sum(comments.token_counts)
+
+
+def analyze_youtube(job, url, sample=False, engine="keywords", cpu=None, mode="full"):
+    comments, total = fetch_comments(url, sample=sample)
+    if not comments:
+        return None
+    job.report("fetched", len(comments), len(comments))
+
+    unique_comments = _run_cpu(cpu, collapse_near_duplicates, comments)
+    # Fast mode may have read only part of a large video
+    summary_input, coverage = unique_comments, len(comments) / total
+    if sample:
+        summary_input, sampled = sample_by_token_budget(unique_comments)
+        coverage *= sampled
+    topics = token_usage = None
+    if mode == "topics":
+        summary, topics, sent_tokens, corpus_tokens = _summarize_by_topic(job, summary_input, cpu)
+        token_usage = (sent_tokens, corpus_tokens)
+    elif mode == "extractive":
+        summary = _run_cpu(cpu, extractive_summary, summary_input)
+    else:
+        if mode == "prefilter":
+            summary_input, kept = _run_cpu(cpu, prefilter, summary_input)
+            coverage *= kept
+        summary = get_summary(
+            summary_input, on_progress=job.report, on_token=job.stream, on_partial=job.add_partial,
+        )
+
+    return {
+        "summary": summary,
+        "topics": topics,
+        "token_usage": token_usage,
+        "comment_count": len(comments),
+        "unique_count": len(unique_comments),
+        "coverage": coverage,
+        "sentiment": _run_cpu(cpu, categorize_replies, comments.texts, engine=engine),
+        "engine": engine,
+        "complete": True,
+    }
+
+
+def analyze_x(job, tweet_id, max_replies=100, engine="keywords", cpu=None, mode="keywords"):
+    client = initialize_twitter_client_v2()
+    comments, warning = fetch_tweet_replies(
+        client, tweet_id, max_replies=max_replies,
+        on_progress=lambda fetched, target, message: job.report("fetched", fetched, target, message),
+    )
+    if not comments:
+        return None
+
+    analysis = _run_cpu(cpu, categorize_replies, comments.texts, engine=engine)
+    topics = token_usage = None
+    if mode == "topics":
+        summary, topics, sent_tokens, corpus_tokens = _summarize_by_topic(job, comments, cpu)
+        token_usage = (sent_tokens, corpus_tokens)
+    elif mode == "extractive":
+        summary = _run_cpu(cpu, extractive_summary, comments)
+    else:
+        summary = summarize_replies(comments.texts, analysis=analysis)
+    return {
+        "summary": summary,
+        "topics": topics,
+        "token_usage": token_usage,
+        "comment_count": len(comments),
+        "sentiment": analysis,
+        "engine": engine,
+        "warning": warning,
+        # A rate-limited fetch returns what it had; the next request fetches the rest
+        "complete": warning is None,
+    }
+
+
+def refresh_watch(job, watch):
+    return watch.refresh()
@@ -0,0 +1,50 @@
+import threading
+import time
+
+
+class RateLimiter:
+    """Thread-safe token bucket allowing `rate` calls per second, with bursts up to `burst`."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(1.0, self.rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens=1):
+        """Block until `tokens` are available, then consume them."""
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Hold back every caller for at least `seconds` (e.g. after a 429)."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, 0.0) - seconds * self.rate
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(name, rate, burst=None):
+    """Return the process-wide RateLimiter for `name` (e.g. a model), created with `rate` on first use.
+
+    Every caller sharing a name draws from one budget, however many engines or jobs they run in.
+    """
+    with _limiters_lock:
+        if name not in _limiters:
+            _limiters[name] = RateLimiter(rate, burst=burst)
+        return _limiters[name]
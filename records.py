@@ -0,0 +1,91 @@
+from tokens import count_tokens_batch
+
+COMMENT_FIELDS = ("comment_id", "parent_id", "author", "text", "like_count", "reply_count", "published_at")
+
+
+class Comment:
+    """A single YouTube comment or X reply."""
+
+    __slots__ = COMMENT_FIELDS + ("multiplicity", "token_count")
+
+    def __init__(self, comment_id, parent_id=None, author=None, text="", like_count=0, reply_count=0, published_at=None):
+        self.comment_id = comment_id
+        self.parent_id = parent_id
+        self.author = author
+        self.text = text
+        self.like_count = like_count or 0
+        self.reply_count = reply_count or 0
+        self.published_at = published_at
+        # Number of near-duplicate comments this record stands for (see dedup)
+        self.multiplicity = 1
+        # Tokens in display_text, filled in once by CommentCorpus.token_counts
+        self.token_count = None
+
+    @property
+    def display_text(self):
+        """Text for the summarizer, noting how often a collapsed comment was repeated."""
+        if self.multiplicity > 1:
+            return f"{self.text} (repeated {self.multiplicity} times)"
+        return self.text
+
+    @property
+    def is_reply(self):
+        return self.parent_id is not None
+
+    def as_tuple(self):
+        return tuple(getattr(self, field) for field in COMMENT_FIELDS)
+
+    def __repr__(self):
+        return f"Comment({self.comment_id!r}, likes={self.like_count}, text={self.text[:40]!r})"
+
+
+class CommentCorpus:
+    """Ordered Comment records with a lazily joined text view for the summarizer."""
+
+    __slots__ = ("comments", "_text")
+
+    def __init__(self, comments=()):
+        self.comments = list(comments)
+        self._text = None
+
+    def __len__(self):
+        return len(self.comments)
+
+    def __iter__(self):
+        return iter(self.comments)
+
+    def __getitem__(self, index):
+        return self.comments[index]
+
+    def extend(self, comments):
+        self.comments.extend(comments)
+        self._text = None
+
+    @property
+    def total_multiplicity(self):
+        """Number of original comments represented, counting collapsed duplicates."""
+        return sum(comment.multiplicity for comment in self.comments)
+
+    @property
+    def texts(self):
+        """Comment texts in order, as the list of strings the reply scorers expect."""
+        return [comment.text for comment in self.comments]
+
+    @property
+    def token_counts(self):
+        """Token count of each comment's display text; each comment is encoded at most once."""
+        missing = [comment for comment in self.comments if comment.token_count is None]
+        if missing:
+            for comment, count in zip(missing, count_tokens_batch(comment.display_text for comment in missing)):
+                comment.token_count = count
+        return [comment.token_count for comment in self.comments]
+
+    @property
+    def text(self):
+        """All comments joined one per line, built once on first access."""
+        if self._text is None:
+            self._text = "".join(f"{comment.display_text}\n" for comment in self.comments)
+        return self._text
+
+    def __str__(self):
+        return self.text
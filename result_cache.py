@@ -0,0 +1,128 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# On-disk location of finished analyses shared across sessions (override with ECHOPULSE_RESULT_CACHE)
+RESULT_CACHE_PATH = os.getenv("ECHOPULSE_RESULT_CACHE", os.path.join(".echopulse", "results.sqlite3"))
+# Results younger than this are served as they are...
+RESULT_FRESH_SECONDS = int(os.getenv("ECHOPULSE_RESULT_FRESH_SECONDS", str(15 * 60)))
+# ...older ones are served while a background job refreshes them, until they are too old to show at all
+RESULT_MAX_AGE_SECONDS = int(os.getenv("ECHOPULSE_RESULT_MAX_AGE_SECONDS", str(24 * 3600)))
+RESULT_CACHE_MAX_ENTRIES = 128
+RESULT_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+"""
+
+
+class ResultCache:
+    """Finished analysis results keyed by job key, e.g. ("youtube", video_id, sample, engine, mode).
+
+    Recent results stay in memory (LRU, `max_entries`); every result is also written to SQLite
+    (LRU by size, `max_bytes`) so other server processes and restarts reuse it. Values must be
+    JSON-serializable; tuples come back from disk as lists.
+    """
+
+    def __init__(self, path=RESULT_CACHE_PATH, fresh_seconds=RESULT_FRESH_SECONDS, max_age_seconds=RESULT_MAX_AGE_SECONDS,
+                 max_entries=RESULT_CACHE_MAX_ENTRIES, max_bytes=RESULT_CACHE_MAX_BYTES):
+        self.path = path
+        self.fresh_seconds = fresh_seconds
+        self.max_age_seconds = max_age_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # key -> (result, created_at)
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def make_key(key):
+        return json.dumps(key, separators=(",", ":"))
+
+    def _remember(self, key, result, created_at):
+        with self._lock:
+            self._memory[key] = (result, created_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key):
+        """Return (result, created_at) for a job key, or None when missing or older than max_age_seconds."""
+        key = self.make_key(key)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+        if entry is None:
+            with self._connect() as conn:
+                row = conn.execute("SELECT value, created_at FROM results WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    conn.execute("UPDATE results SET last_access = ? WHERE key = ?", (now, key))
+            if row is None:
+                return None
+            entry = (json.loads(row[0]), row[1])
+            self._remember(key, *entry)
+        if now - entry[1] > self.max_age_seconds:
+            return None
+        return entry
+
+    def is_fresh(self, created_at):
+        return time.time() - created_at <= self.fresh_seconds
+
+    def put(self, key, result):
+        """Store a result, then evict the least recently used disk entries beyond max_bytes and max age."""
+        key = self.make_key(key)
+        now = time.time()
+        value = json.dumps(result)
+        self._remember(key, result, now)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value.encode("utf-8")), now, now),
+            )
+            conn.execute("DELETE FROM results WHERE created_at < ?", (now - self.max_age_seconds,))
+            conn.execute(
+                "DELETE FROM results WHERE key IN ("
+                "SELECT key FROM (SELECT key, SUM(size) OVER (ORDER BY last_access DESC) AS running FROM results) "
+                "WHERE running > ?)",
+                (self.max_bytes,),
+            )
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """Return the process-wide ResultCache, creating it on first use."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ResultCache()
+        return _default_cache
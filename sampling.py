@@ -0,0 +1,80 @@
+import math
+import random
+from datetime import datetime
+from records import CommentCorpus
+
+# Token budget of the sampled corpus; keeps summarization to a bounded number of map calls
+SAMPLE_TOKEN_BUDGET = 60000
+# Comments are split into this many time strata so every period of the discussion is represented
+SAMPLE_STRATA = 10
+
+
+def _timestamp(published_at):
+    if not published_at:
+        return None
+    try:
+        return datetime.fromisoformat(published_at.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def engagement_weight(comment, recency):
+    """Sampling weight from likes, replies, duplicate count and recency (0 oldest .. 1 newest)."""
+    return (
+        1.0
+        + math.log1p(comment.like_count)
+        + 0.5 * math.log1p(comment.reply_count)
+        + 0.5 * math.log1p(comment.multiplicity - 1)
+        + recency
+    )
+
+
+def sample_by_token_budget(comments, token_budget=SAMPLE_TOKEN_BUDGET, strata=SAMPLE_STRATA, seed=None):
+    """Pick a time-stratified, engagement-weighted subset whose text fits in `token_budget`.
+
+    Returns (corpus, coverage): the sampled comments in their original order and the fraction
+    of the original comments (counting collapsed duplicates) they represent.
+    """
+    comments = list(comments)
+    total_comments = sum(comment.multiplicity for comment in comments)
+    if not comments:
+        return CommentCorpus(), 1.0
+    token_counts = CommentCorpus(comments).token_counts
+    # +1 per comment for the newline separator
+    if sum(token_counts) + len(comments) <= token_budget:
+        return CommentCorpus(comments), 1.0
+
+    timestamps = [_timestamp(comment.published_at) for comment in comments]
+    known = [ts for ts in timestamps if ts is not None]
+    oldest, newest = (min(known), max(known)) if known else (0.0, 0.0)
+    span = (newest - oldest) or 1.0
+    recency = [(ts - oldest) / span if ts is not None else 0.5 for ts in timestamps]
+
+    # Equal-size strata over publication order; each gets budget in proportion to its tokens
+    order = sorted(range(len(comments)), key=lambda i: (timestamps[i] is None, timestamps[i] or 0.0))
+    stratum_size = math.ceil(len(order) / strata)
+    total_tokens = sum(token_counts) + len(comments)
+    rng = random.Random(seed)
+
+    chosen = []
+    carry = 0
+    for start in range(0, len(order), stratum_size):
+        stratum = order[start:start + stratum_size]
+        stratum_tokens = sum(token_counts[i] + 1 for i in stratum)
+        budget = token_budget * stratum_tokens // total_tokens + carry
+        # Weighted sampling without replacement (Efraimidis-Spirakis keys)
+        keyed = sorted(
+            stratum,
+            key=lambda i: rng.random() ** (1.0 / engagement_weight(comments[i], recency[i])),
+            reverse=True,
+        )
+        for i in keyed:
+            cost = token_counts[i] + 1
+            if cost <= budget:
+                chosen.append(i)
+                budget -= cost
+        carry = budget
+
+    chosen.sort()
+    sample = CommentCorpus(comments[i] for i in chosen)
+    return sample, sample.total_multiplicity / total_comments
@@ -0,0 +1,171 @@
+import os
+import threading
+import time
+
+# Local sentiment model; downloaded on first use, then loaded from the Hugging Face cache only
+SENTIMENT_MODEL = os.getenv("ECHOPULSE_SENTIMENT_MODEL", "distilbert-base-uncased-finetuned-sst-2-english")
+SENTIMENT_THREADS = int(os.getenv("ECHOPULSE_SENTIMENT_THREADS", "0")) or None
+SENTIMENT_INT8 = os.getenv("ECHOPULSE_SENTIMENT_INT8", "") == "1"
+SENTIMENT_MAX_LENGTH = 256
+# Batches are packed up to this many (padded) tokens, so short replies run in large batches
+SENTIMENT_BATCH_TOKENS = 8192
+# SST-2 style models are binary; predictions below this confidence count as neutral
+NEUTRAL_THRESHOLD = 0.75
+
+
+# Label names models use for each class, lowercased
+_LABEL_NAMES = {
+    "positive": "positive", "pos": "positive",
+    "negative": "negative", "neg": "negative",
+    "neutral": "neutral", "neu": "neutral",
+}
+# Models with generic LABEL_<n> names follow the SST-2 (negative, positive) and
+# cardiffnlp (negative, neutral, positive) conventions
+_GENERIC_LABELS = {
+    2: ("negative", "positive"),
+    3: ("negative", "neutral", "positive"),
+}
+
+
+def sentiment_labels(id2label):
+    """Map a model's class ids to "positive", "negative" or "neutral"; ValueError if a label is unknown."""
+    names = {label_id: str(name).lower() for label_id, name in id2label.items()}
+    if all(name in _LABEL_NAMES for name in names.values()):
+        return {label_id: _LABEL_NAMES[name] for label_id, name in names.items()}
+    generic = _GENERIC_LABELS.get(len(names))
+    if generic and set(names.values()) == {f"label_{i}" for i in range(len(names))}:
+        return {label_id: generic[int(name[len("label_"):])] for label_id, name in names.items()}
+    raise ValueError(
+        f"Unrecognized sentiment labels {sorted(names.values())}; expected positive/negative(/neutral) "
+        f"or LABEL_0..LABEL_{len(names) - 1} for a 2- or 3-class model"
+    )
+
+
+def length_sorted_batches(lengths, batch_tokens):
+    """Group indices sorted by token length into batches whose padded size fits batch_tokens."""
+    batch = []
+    for index in sorted(range(len(lengths)), key=lengths.__getitem__):
+        # Sorted ascending, so the newest item sets the padded length of the batch
+        if batch and (len(batch) + 1) * lengths[index] > batch_tokens:
+            yield batch
+            batch = []
+        batch.append(index)
+    if batch:
+        yield batch
+
+
+class LocalTransformer:
+    """A Hugging Face model on CPU, loaded lazily (from the local cache once downloaded) and run
+    in length-sorted batches. Subclasses pick the model class and read each batch's outputs."""
+
+    # Name of the transformers Auto* class that loads the model
+    model_class = "AutoModel"
+
+    def __init__(self, model_name, threads, max_length, batch_tokens):
+        self.model_name = model_name
+        self.threads = threads
+        self.max_length = max_length
+        self.batch_tokens = batch_tokens
+        self.last_stats = None
+        self._tokenizer = None
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _prepare(self, model):
+        """Check or convert a freshly loaded model before it is kept; runs under the lock."""
+        return model
+
+    def _load(self):
+        import torch
+        import transformers
+
+        with self._lock:
+            if self._model is not None:
+                return
+            if self.threads:
+                torch.set_num_threads(self.threads)
+            model_class = getattr(transformers, self.model_class)
+            try:
+                # Avoid any network round trip once the model is in the local cache
+                tokenizer = transformers.AutoTokenizer.from_pretrained(self.model_name, local_files_only=True)
+                model = model_class.from_pretrained(self.model_name, local_files_only=True)
+            except OSError:
+                tokenizer = transformers.AutoTokenizer.from_pretrained(self.model_name)
+                model = model_class.from_pretrained(self.model_name)
+            model.eval()
+            model = self._prepare(model)
+            self._tokenizer = tokenizer
+            self._model = model
+
+    def _run_batches(self, texts, on_batch):
+        """Tokenize `texts` and call on_batch(indices, inputs, outputs) for each length-sorted batch."""
+        import torch
+
+        self._load()
+        # Fast tokenizers are not safe to share across threads, so a whole call holds the lock
+        with self._lock, torch.inference_mode():
+            encoded = self._tokenizer(texts, truncation=True, max_length=self.max_length)
+            lengths = [len(ids) for ids in encoded["input_ids"]]
+            for batch in length_sorted_batches(lengths, self.batch_tokens):
+                inputs = self._tokenizer.pad(
+                    {key: [encoded[key][i] for i in batch] for key in encoded.keys()}, return_tensors="pt"
+                )
+                on_batch(batch, inputs, self._model(**inputs))
+
+
+class LocalSentimentModel(LocalTransformer):
+    """Transformer sentiment classifier for CPU, loaded lazily and run in length-sorted batches."""
+
+    model_class = "AutoModelForSequenceClassification"
+
+    def __init__(self, model_name=SENTIMENT_MODEL, threads=SENTIMENT_THREADS, quantize=SENTIMENT_INT8,
+                 max_length=SENTIMENT_MAX_LENGTH, batch_tokens=SENTIMENT_BATCH_TOKENS):
+        super().__init__(model_name, threads, max_length, batch_tokens)
+        self.quantize = quantize
+        self._labels = None
+
+    def _prepare(self, model):
+        import torch
+
+        # Checked before the model is kept, so a misconfigured model fails on every call
+        self._labels = sentiment_labels(model.config.id2label)
+        if self.quantize:
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return model
+
+    def classify(self, texts):
+        """Return a "positive", "negative" or "neutral" label for each text."""
+        import torch
+
+        texts = list(texts)
+        if not texts:
+            return []
+        started = time.perf_counter()
+        labels = [None] * len(texts)
+
+        def read(batch, inputs, outputs):
+            confidence, predicted = torch.softmax(outputs.logits, dim=-1).max(dim=-1)
+            for i, score, label_id in zip(batch, confidence.tolist(), predicted.tolist()):
+                labels[i] = self._labels[label_id] if score >= NEUTRAL_THRESHOLD else "neutral"
+
+        self._run_batches(texts, read)
+        elapsed = time.perf_counter() - started
+        self.last_stats = {
+            "replies": len(texts),
+            "seconds": elapsed,
+            "replies_per_second": len(texts) / elapsed if elapsed else float("inf"),
+        }
+        return labels
+
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def get_sentiment_model(threads=SENTIMENT_THREADS, quantize=SENTIMENT_INT8):
+    """Return the process-wide LocalSentimentModel for a thread count / quantization setting."""
+    key = (threads, quantize)
+    with _models_lock:
+        if key not in _models:
+            _models[key] = LocalSentimentModel(threads=threads, quantize=quantize)
+        return _models[key]
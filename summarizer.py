@@ -0,0 +1,171 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from metrics import get_metrics
+from ratelimit import get_rate_limiter
+from tokens import count_tokens
+
+# LangChain's default map_reduce prompt, used for both the map and the reduce calls
+SUMMARY_PROMPT = """Write a concise summary of the following:
+
+
+"{text}"
+
+
+CONCISE SUMMARY:"""
+
+MAP_CONCURRENCY = 8
+REQUESTS_PER_MINUTE = 60
+# Partial summaries whose combined size exceeds this are reduced in groups, level by level
+REDUCE_TOKEN_LIMIT = 3000
+
+
+def _message_text(message):
+    content = message.content
+    if isinstance(content, list):
+        return "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+    return content
+
+
+def _usage_tokens(message):
+    """(input, output) token counts reported by the model, or None when it reports none."""
+    usage = getattr(message, "usage_metadata", None)
+    if not usage:
+        return None
+    return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+
+
+class SummaryEngine:
+    """Map-reduce summarizer with concurrent map calls and a tree-shaped reduce."""
+
+    def __init__(self, llm, concurrency=MAP_CONCURRENCY, requests_per_minute=REQUESTS_PER_MINUTE,
+                 reduce_token_limit=REDUCE_TOKEN_LIMIT, prompt=SUMMARY_PROMPT, cache=None):
+        self.llm = llm
+        self.model_name = getattr(llm, "model", None) or type(llm).__name__
+        self.cache = cache
+        self.concurrency = max(1, concurrency)
+        self.reduce_token_limit = reduce_token_limit
+        self.prompt = prompt
+        # One request budget per model for the whole process, shared by every engine and job
+        self._limiter = get_rate_limiter(("llm", self.model_name), requests_per_minute / 60.0, burst=self.concurrency)
+
+    def _complete(self, text, on_token=None, phase="map"):
+        """Summarize one text, passing generated pieces to on_token as they stream in."""
+        key = None
+        if self.cache is not None:
+            key = self.cache.make_key(self.model_name, self.prompt, text)
+            cached = self.cache.get(key)
+            if cached is not None:
+                if on_token:
+                    on_token(cached)
+                return cached
+        self._limiter.acquire()
+        prompt = self.prompt.format(text=text)
+        usage = None
+        if on_token:
+            pieces = []
+            for chunk in self.llm.stream(prompt):
+                # Streamed chunks report usage as deltas, so they add up to the call's total
+                chunk_usage = _usage_tokens(chunk)
+                if chunk_usage:
+                    usage = tuple(a + b for a, b in zip(usage or (0, 0), chunk_usage))
+                piece = _message_text(chunk)
+                if piece:
+                    pieces.append(piece)
+                    on_token(piece)
+            summary = "".join(pieces)
+        else:
+            message = self.llm.invoke(prompt)
+            usage = _usage_tokens(message)
+            summary = _message_text(message)
+        self._record_call(phase, prompt, summary, usage)
+        if key is not None:
+            self.cache.put(key, summary)
+        return summary
+
+    def _record_call(self, phase, prompt, summary, usage):
+        metrics = get_metrics()
+        metrics.inc("echopulse_llm_calls_total", phase=phase)
+        # Fall back to our own token counts when the model doesn't report usage
+        sent, received = usage or (count_tokens(prompt), count_tokens(summary))
+        metrics.inc("echopulse_llm_tokens_total", sent, direction="sent")
+        metrics.inc("echopulse_llm_tokens_total", received, direction="received")
+
+    def _summarize_all(self, texts, on_done=None, phase="map"):
+        """Summarize texts concurrently, calling on_done(index, summary, completed, total) as each finishes."""
+        completed = [0]
+        lock = threading.Lock()
+
+        def complete(index, text):
+            summary = self._complete(text, phase=phase)
+            if on_done:
+                with lock:
+                    completed[0] += 1
+                    on_done(index, summary, completed[0], len(texts))
+            return summary
+
+        if len(texts) == 1:
+            return [complete(0, texts[0])]
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(texts))) as pool:
+            return list(pool.map(complete, range(len(texts)), texts))
+
+    def _group(self, summaries):
+        """Pack consecutive summaries into groups that fit the reduce token limit."""
+        groups = []
+        current, current_tokens = [], 0
+        for summary in summaries:
+            tokens = count_tokens(summary)
+            if current and current_tokens + tokens > self.reduce_token_limit:
+                groups.append(current)
+                current, current_tokens = [], 0
+            current.append(summary)
+            current_tokens += tokens
+        if current:
+            groups.append(current)
+        return groups
+
+    def map(self, chunks, on_progress=None, on_partial=None):
+        """Summarize each chunk concurrently, returning the chunk summaries in order."""
+        def mapped(index, summary, done, total):
+            if on_partial:
+                on_partial(index, summary)
+            if on_progress:
+                on_progress("mapped", done, total)
+
+        with get_metrics().timer("map"):
+            return self._summarize_all(chunks, on_done=mapped)
+
+    def reduce(self, summaries, on_progress=None, on_token=None):
+        """Combine chunk summaries level by level until one final call fits, streaming that call."""
+        report = on_progress or (lambda stage, done=None, total=None: None)
+        with get_metrics().timer("reduce"):
+            groups = self._group(summaries)
+            level = 0
+            # Stop collapsing once grouping no longer merges anything, so oversized summaries can't loop
+            while len(groups) > 1 and len(groups) < len(summaries):
+                summaries = self._summarize_all(["\n\n".join(group) for group in groups], phase="reduce")
+                groups = self._group(summaries)
+                level += 1
+                report("reduced", level, None)
+            summary = self._complete("\n\n".join(summaries), on_token=on_token, phase="reduce")
+        report("reduced", level + 1, level + 1)
+        return summary
+
+    def summarize(self, chunks, on_progress=None, on_token=None, on_partial=None):
+        """Summarize text chunks: map them concurrently, then reduce until one call fits.
+
+        `on_progress(stage, done, total)` is called with stage "mapped" as chunk summaries
+        complete and "reduced" as each reduce level finishes. The final call (or the only
+        call, for a single chunk) streams its text through `on_token(piece)`, and
+        `on_partial(index, summary)` receives each chunk summary as the map phase produces it.
+        """
+        if not chunks:
+            return ""
+        if len(chunks) == 1:
+            with get_metrics().timer("reduce"):
+                summary = self._complete(chunks[0], on_token=on_token, phase="reduce")
+            if on_progress:
+                on_progress("reduced", 1, 1)
+            return summary
+
+        summaries = self.map(chunks, on_progress=on_progress, on_partial=on_partial)
+        return self.reduce(summaries, on_progress=on_progress, on_token=on_token)
@@ -0,0 +1,51 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import tokens  # noqa: E402
+from fakes import load_recorded_pages  # noqa: E402
+
+FIXTURES = os.path.join(ROOT, "benchmarks", "fixtures")
+
+
+class _WhitespaceEncoder:
+    """One token per space-separated word; used when tiktoken cannot fetch its vocabulary offline."""
+
+    def encode(self, text, **kwargs):
+        return text.split(" ")
+
+    def encode_ordinary(self, text):
+        return text.split(" ")
+
+    def encode_ordinary_batch(self, texts):
+        return [text.split(" ") for text in texts]
+
+    def decode(self, tokens):
+        return " ".join(tokens)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def encoder():
+    """The real GPT-2 encoder when it loads, otherwise a whitespace stand-in with the same interface."""
+    try:
+        return tokens.get_encoder()
+    except Exception:
+        tokens._encoder = _WhitespaceEncoder()
+        return tokens._encoder
+
+
+@pytest.fixture
+def recorded_pages():
+    return load_recorded_pages(os.path.join(FIXTURES, "recorded_pages.json"))
+
+
+@pytest.fixture
+def recorded_comments(recorded_pages):
+    from comments import load_comments_in_format
+
+    return load_comments_in_format([thread for page in recorded_pages for thread in page["items"]])
@@ -0,0 +1,43 @@
+from chunking import pack_comments
+from records import Comment, CommentCorpus
+
+
+def test_chunks_respect_token_limit_and_keep_order(recorded_comments):
+    chunks, counts = pack_comments(recorded_comments, max_tokens=40)
+    assert len(chunks) > 1
+    assert all(count <= 40 for count in counts)
+    assert "".join(chunks) == recorded_comments.text
+
+
+def test_counts_match_comment_tokens(recorded_comments):
+    _, counts = pack_comments(recorded_comments, max_tokens=40)
+    assert sum(counts) == sum(recorded_comments.token_counts) + len(recorded_comments)
+
+
+def test_everything_fits_in_one_chunk(recorded_comments):
+    chunks, _ = pack_comments(recorded_comments)
+    assert chunks == [recorded_comments.text]
+
+
+def test_oversized_comment_is_split_alone():
+    long_text = " ".join(f"word{i}" for i in range(100))
+    corpus = CommentCorpus([Comment("a", text="short one"), Comment("b", text=long_text), Comment("c", text="short two")])
+    chunks, counts = pack_comments(corpus, max_tokens=30)
+    assert chunks[0] == "short one\n"
+    assert chunks[-1] == "short two\n"
+    assert all(count <= 30 for count in counts)
+    # Cuts fall on token boundaries, which may be inside a word
+    pieces = "".join(chunk[:-1] for chunk in chunks[1:-1])
+    assert pieces.replace(" ", "") == long_text.replace(" ", "")
+
+
+def test_plain_text_is_one_comment_per_line():
+    chunks, _ = pack_comments("first line\n\nsecond line\n")
+    assert chunks == ["first line\nsecond line\n"]
+
+
+def test_repeated_comments_are_labelled():
+    comment = Comment("a", text="first")
+    comment.multiplicity = 3
+    chunks, _ = pack_comments([comment])
+    assert chunks == ["first (repeated 3 times)\n"]
@@ -0,0 +1,61 @@
+import sqlite3
+
+from comment_store import CommentStore
+from records import Comment
+
+
+def _store(tmp_path):
+    return CommentStore(str(tmp_path / "comments.sqlite3"))
+
+
+def test_add_comments_returns_only_new(tmp_path, recorded_comments):
+    store = _store(tmp_path)
+    assert len(store.add_comments("youtube", "v1", recorded_comments)) == len(recorded_comments)
+    assert store.add_comments("youtube", "v1", recorded_comments[:3]) == []
+    assert len(store.add_comments("youtube", "v2", recorded_comments[:3])) == 3
+    assert store.has_comment("youtube", "v1", recorded_comments[0].comment_id)
+    assert not store.has_comment("x", "v1", recorded_comments[0].comment_id)
+
+
+def test_load_comments_round_trip(tmp_path, recorded_comments):
+    store = _store(tmp_path)
+    store.add_comments("youtube", "v1", recorded_comments)
+    loaded = store.load_comments("youtube", "v1")
+    assert [comment.as_tuple() for comment in loaded] == [comment.as_tuple() for comment in recorded_comments]
+
+
+def test_load_newest_first_with_limit(tmp_path):
+    store = _store(tmp_path)
+    store.add_comments("x", "c", [
+        Comment("1", text="old", published_at="2024-01-01T00:00:00Z"),
+        Comment("3", text="new", published_at="2024-01-03T00:00:00Z"),
+        Comment("2", text="mid", published_at="2024-01-02T00:00:00Z"),
+    ])
+    assert [comment.text for comment in store.load_comments("x", "c", limit=2, newest_first=True)] == ["new", "mid"]
+    assert [comment.text for comment in store.load_comments("x", "c", limit=2)] == ["old", "new"]
+
+
+def test_mark_synced_keeps_high_water_mark(tmp_path):
+    store = _store(tmp_path)
+    assert store.sync_state("youtube", "v1") is None
+    store.mark_synced("youtube", "v1", "c9", "2024-01-09T00:00:00Z", resume_token="page2", resume_floor_id="c1")
+    assert store.sync_state("youtube", "v1")[:2] == ("c9", "2024-01-09T00:00:00Z")
+    assert store.sync_state("youtube", "v1")[3:] == ("page2", "c1")
+    # No new comments: the mark stays, and the gap is recorded as filled
+    store.mark_synced("youtube", "v1")
+    state = store.sync_state("youtube", "v1")
+    assert state[:2] == ("c9", "2024-01-09T00:00:00Z")
+    assert state[3:] == (None, None)
+
+
+def test_adds_resume_columns_to_older_stores(tmp_path):
+    path = str(tmp_path / "comments.sqlite3")
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "CREATE TABLE sync_state (source TEXT NOT NULL, key TEXT NOT NULL, last_seen_id TEXT, "
+            "last_seen_at TEXT, synced_at REAL NOT NULL, PRIMARY KEY (source, key))"
+        )
+        conn.execute("INSERT INTO sync_state VALUES ('youtube', 'v1', 'c1', NULL, 0)")
+    conn.close()
+    store = CommentStore(path)
+    assert store.sync_state("youtube", "v1") == ("c1", None, 0, None, None)
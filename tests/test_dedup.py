@@ -0,0 +1,57 @@
+import os
+import subprocess
+import sys
+
+from dedup import MAX_HAMMING_DISTANCE, _hamming, collapse_near_duplicates, normalize_comment, simhash_signatures
+from records import Comment
+
+TEMPLATE = (
+    "please subscribe to my channel for daily videos about cooking baking and grilling "
+    "at home with family and friends every weekend"
+)
+
+
+def test_normalize_comment():
+    assert normalize_comment("  First!!!  ") == "first"
+    assert normalize_comment("Sooooo GOOD https://example.com/x") == "soo good"
+    assert normalize_comment("ＦＵＬＬ width") == "full width"
+
+
+def test_collapses_exact_duplicates_after_normalization(recorded_comments):
+    collapsed = collapse_near_duplicates(recorded_comments)
+    repeated = {comment.text: comment for comment in collapsed if comment.multiplicity > 1}
+    assert repeated["first"].multiplicity == 3
+    assert repeated["Great video 🔥🔥"].multiplicity == 2
+    assert repeated["Great video 🔥🔥"].like_count == 4
+    assert collapsed.total_multiplicity == len(recorded_comments)
+
+
+def test_collapses_near_duplicates():
+    texts = [TEMPLATE, TEMPLATE + " now", TEMPLATE + " thanks", "a different comment about the call stack animation"]
+    collapsed = collapse_near_duplicates([Comment(str(i), text=text) for i, text in enumerate(texts)])
+    assert [comment.multiplicity for comment in collapsed] == [3, 1]
+    assert collapsed[0].comment_id == "0"
+
+
+def test_short_texts_only_collapse_on_exact_match():
+    collapsed = collapse_near_duplicates([Comment("a", text="nice video"), Comment("b", text="nice videos")])
+    assert len(collapsed) == 2
+
+
+def test_simhash_near_texts_are_close():
+    signatures = simhash_signatures([TEMPLATE, TEMPLATE + " now", "totally unrelated words about recursion and stacks"])
+    assert _hamming(signatures[0], signatures[1]) <= MAX_HAMMING_DISTANCE
+    assert _hamming(signatures[0], signatures[2]) > MAX_HAMMING_DISTANCE
+
+
+def test_simhash_is_stable_across_processes():
+    code = "from dedup import simhash_signatures; print(simhash_signatures(['the same words every run']))"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    outputs = {
+        subprocess.run(
+            [sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True,
+            env={**os.environ, "PYTHONHASHSEED": seed},
+        ).stdout
+        for seed in ("1", "2")
+    }
+    assert len(outputs) == 1
@@ -0,0 +1,29 @@
+from extractive import EXTRACT_MAX_CHARS, extract_comments, extractive_summary
+from records import Comment
+
+
+def test_picks_distinct_comments(recorded_comments):
+    picked = extract_comments(recorded_comments, count=5)
+    assert len(picked) == 5
+    assert len({comment.comment_id for comment in picked}) == 5
+
+
+def test_summary_escapes_markup():
+    comments = [
+        Comment("a", text="<b>bold</b> claims in the title, but <script>alert(1)</script> the content delivered"),
+        Comment("b", text="the content delivered on the claims in the title"),
+    ]
+    summary = extractive_summary(comments)
+    assert "<b>" not in summary and "<script>" not in summary
+    assert "&lt;b&gt;bold&lt;/b&gt;" in summary
+
+
+def test_long_comments_are_shortened_before_escaping():
+    summary = extractive_summary([Comment("a", text="word & " * 100)])
+    assert summary.endswith("…”")
+    assert "&amp" not in summary.replace("&amp;", "")
+    assert len(summary) < EXTRACT_MAX_CHARS * 2
+
+
+def test_empty_input():
+    assert extractive_summary([]) == "No comments to summarize."
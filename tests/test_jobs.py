@@ -0,0 +1,94 @@
+import threading
+
+from jobs import JobManager
+from result_cache import ResultCache
+
+
+def _blocking(release, calls):
+    def run(job, value):
+        calls.append(value)
+        release.wait(5)
+        return {"value": value}
+    return run
+
+
+def test_identical_submissions_share_one_job():
+    manager = JobManager()
+    release, calls = threading.Event(), []
+    fn = _blocking(release, calls)
+    first = manager.submit(("youtube", "v1"), fn, 1)
+    second = manager.submit(("youtube", "v1"), fn, 1)
+    other = manager.submit(("youtube", "v2"), fn, 2)
+    assert first == second
+    assert other != first
+    release.set()
+    assert manager.get(first).wait(5)
+    assert manager.get(other).wait(5)
+    assert sorted(calls) == [1, 2]
+    assert manager.get(first).result == {"value": 1}
+
+
+def test_finished_key_runs_again():
+    manager = JobManager()
+    release, calls = threading.Event(), []
+    release.set()
+    first = manager.submit("key", _blocking(release, calls), 1)
+    manager.get(first).wait(5)
+    second = manager.submit("key", _blocking(release, calls), 1)
+    manager.get(second).wait(5)
+    assert first != second
+    assert calls == [1, 1]
+
+
+def test_failure_is_recorded_on_the_job():
+    def fail(job):
+        raise RuntimeError("quota exceeded")
+
+    manager = JobManager()
+    job = manager.get(manager.submit("key", fail))
+    assert job.wait(5)
+    assert (job.status, job.error, job.result) == ("failed", "quota exceeded", None)
+
+
+def test_cached_result_is_served_without_running(tmp_path):
+    manager = JobManager(cache=ResultCache(str(tmp_path / "results.sqlite3")))
+    release, calls = threading.Event(), []
+    release.set()
+    first = manager.get(manager.submit_cached(("youtube", "v1"), _blocking(release, calls), 1))
+    assert first.wait(5) and first.cached_at is None
+    second = manager.get(manager.submit_cached(("youtube", "v1"), _blocking(release, calls), 1))
+    assert second.finished
+    assert second.result == {"value": 1}
+    assert second.cached_at is not None and second.refresh_id is None
+    assert calls == [1]
+
+
+def test_empty_result_is_not_cached(tmp_path):
+    manager = JobManager(cache=ResultCache(str(tmp_path / "results.sqlite3")))
+    calls = []
+
+    def nothing(job):
+        calls.append(1)
+
+    manager.get(manager.submit_cached("key", nothing)).wait(5)
+    manager.get(manager.submit_cached("key", nothing)).wait(5)
+    assert calls == [1, 1]
+
+
+def test_incomplete_result_is_not_cached(tmp_path):
+    manager = JobManager(cache=ResultCache(str(tmp_path / "results.sqlite3")))
+    calls = []
+
+    def rate_limited(job):
+        calls.append(1)
+        return {"summary": "partial", "complete": len(calls) > 1}
+
+    first = manager.get(manager.submit_cached("key", rate_limited))
+    first.wait(5)
+    assert first.result["complete"] is False
+    second = manager.get(manager.submit_cached("key", rate_limited))
+    second.wait(5)
+    assert second.cached_at is None and second.result["complete"] is True
+    third = manager.get(manager.submit_cached("key", rate_limited))
+    assert third.cached_at is not None
+    assert calls == [1, 1]
@@ -0,0 +1,56 @@
+import itertools
+
+import llm_cache
+from llm_cache import LLMCache
+
+
+def _cache(tmp_path, **kwargs):
+    return LLMCache(str(tmp_path / "llm_cache.sqlite3"), **kwargs)
+
+
+def test_key_depends_on_every_part():
+    key = LLMCache.make_key("model", "prompt", "text")
+    assert key == LLMCache.make_key("model", "prompt", "text")
+    assert key != LLMCache.make_key("model2", "prompt", "text")
+    assert LLMCache.make_key("m", "ab", "c") != LLMCache.make_key("m", "a", "bc")
+
+
+def test_put_get_and_stats(tmp_path):
+    cache = _cache(tmp_path)
+    key = LLMCache.make_key("model", "prompt", "text")
+    assert cache.get(key) is None
+    cache.put(key, "summary")
+    assert cache.get(key) == "summary"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+    assert (stats["entries"], stats["bytes"]) == (1, len("summary"))
+
+
+def test_shared_between_instances(tmp_path):
+    _cache(tmp_path).put("key", "value")
+    assert _cache(tmp_path).get("key") == "value"
+
+
+def test_expired_entries_are_dropped(tmp_path, monkeypatch):
+    clock = itertools.count(1000)
+    monkeypatch.setattr(llm_cache.time, "time", lambda: next(clock))
+    cache = _cache(tmp_path, ttl_seconds=5)
+    cache.put("key", "value")
+    assert cache.get("key") == "value"
+    for _ in range(10):
+        next(clock)
+    assert cache.get("key") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_evicts_least_recently_used_beyond_max_bytes(tmp_path, monkeypatch):
+    clock = itertools.count(1000)
+    monkeypatch.setattr(llm_cache.time, "time", lambda: next(clock))
+    cache = _cache(tmp_path, max_bytes=10)
+    cache.put("a", "aaaa")
+    cache.put("b", "bbbb")
+    assert cache.get("a") == "aaaa"
+    cache.put("c", "cccc")
+    assert cache.get("b") is None
+    assert cache.get("a") == "aaaa"
+    assert cache.get("c") == "cccc"
@@ -0,0 +1,28 @@
+import glob
+import os
+import re
+
+from jobs import JobManager
+from metrics import METRICS, get_metrics
+from result_cache import ResultCache
+
+
+def test_result_cache_lookups_are_exported(tmp_path):
+    manager = JobManager(cache=ResultCache(str(tmp_path / "results.sqlite3")))
+    manager.get(manager.submit_cached("key", lambda job: {"summary": "s"})).wait(5)
+    manager.get(manager.submit_cached("key", lambda job: {"summary": "s"}))
+    text = get_metrics().to_prometheus()
+    assert "# TYPE echopulse_result_cache_total counter" in text
+    assert 'echopulse_result_cache_total{outcome="miss"}' in text
+    assert 'echopulse_result_cache_total{outcome="hit"}' in text
+
+
+
+def test_every_recorded_metric_is_registered():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    recorded = set()
+    for path in glob.glob(os.path.join(root, "*.py")):
+        with open(path, encoding="utf-8") as f:
+            recorded.update(re.findall(r'\.(?:inc|observe)\(\s*"(echopulse_\w+)"', f.read()))
+    assert recorded
+    assert recorded <= set(METRICS)
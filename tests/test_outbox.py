@@ -0,0 +1,76 @@
+from outbox import EmailOutbox, OutboxSender, SMTPSettings
+
+
+class _Connection:
+    def __init__(self):
+        self.sent = []
+
+    def noop(self):
+        pass
+
+    def send_message(self, message):
+        self.sent.append(message)
+
+
+def _sender(tmp_path, connection):
+    outbox = EmailOutbox(str(tmp_path / "outbox.sqlite3"))
+    sender = OutboxSender(outbox, SMTPSettings("localhost", username="site@example.com", recipient="team@example.com"))
+    sender._open = lambda: connection
+    return outbox, sender
+
+
+def test_missing_settings():
+    assert SMTPSettings("smtp.example.com").missing() == ["CONTACT_SENDER or SMTP_USERNAME", "CONTACT_RECIPIENT"]
+    assert SMTPSettings("smtp.example.com", username="site@example.com").missing() == []
+    assert SMTPSettings("", sender="a@example.com", recipient="b@example.com").missing() == ["SMTP_HOST"]
+
+
+def test_sends_due_messages(tmp_path):
+    connection = _Connection()
+    outbox, sender = _sender(tmp_path, connection)
+    outbox.enqueue("Hello", "Body", reply_to="visitor@example.com")
+    assert sender.send_due() == 1
+    message = connection.sent[0]
+    assert (message["From"], message["To"], message["Reply-To"]) == ("site@example.com", "team@example.com", "visitor@example.com")
+    assert outbox.counts() == {"pending": 0, "sent": 1, "failed": 0}
+
+
+def test_unbuildable_message_is_not_retried(tmp_path):
+    connection = _Connection()
+    outbox, sender = _sender(tmp_path, connection)
+    outbox.enqueue("Injected\nBcc: everyone@example.com", "Body")
+    outbox.enqueue("Fine", "Body")
+    assert sender.send_due() == 1
+    assert [message["Subject"] for message in connection.sent] == ["Fine"]
+    assert outbox.counts() == {"pending": 0, "sent": 1, "failed": 1}
+    assert outbox.next_attempt_at() is None
+
+
+def test_send_failure_is_retried_later(tmp_path):
+    class Refusing(_Connection):
+        def send_message(self, message):
+            raise OSError("connection reset")
+
+        def close(self):
+            pass
+
+        def quit(self):
+            pass
+
+    outbox, sender = _sender(tmp_path, Refusing())
+    outbox.enqueue("Hello", "Body")
+    assert sender.send_due() == 0
+    assert outbox.counts() == {"pending": 1, "sent": 0, "failed": 0}
+    assert outbox.due() == []
+
+
+def test_string_flags_from_secrets(monkeypatch):
+    import streamlit as st
+
+    secrets = {"SMTP_HOST": "localhost", "SMTP_USERNAME": "site@example.com", "SMTP_STARTTLS": "false", "SMTP_SSL": "0"}
+    monkeypatch.setattr(st, "secrets", secrets)
+    settings = SMTPSettings.from_secrets()
+    assert (settings.starttls, settings.use_ssl) == (False, False)
+    secrets.update(SMTP_STARTTLS="True", SMTP_SSL=True)
+    settings = SMTPSettings.from_secrets()
+    assert (settings.starttls, settings.use_ssl) == (True, True)
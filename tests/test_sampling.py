@@ -0,0 +1,65 @@
+from records import Comment, CommentCorpus
+from sampling import sample_by_token_budget
+
+
+def _comments(count):
+    return [
+        Comment(
+            str(i),
+            text=f"comment {i} " + "word " * (i % 7),
+            like_count=i % 11,
+            published_at=f"2024-03-{1 + i * 28 // count:02d}T12:00:00Z",
+        )
+        for i in range(count)
+    ]
+
+
+def _cost(corpus):
+    return sum(corpus.token_counts) + len(corpus)
+
+
+def test_under_budget_keeps_everything(recorded_comments):
+    sample, coverage = sample_by_token_budget(recorded_comments, token_budget=10**6)
+    assert len(sample) == len(recorded_comments)
+    assert coverage == 1.0
+
+
+def test_empty_input():
+    sample, coverage = sample_by_token_budget([])
+    assert len(sample) == 0
+    assert coverage == 1.0
+
+
+def test_sample_fits_budget_in_original_order():
+    comments = _comments(500)
+    budget = _cost(CommentCorpus(comments)) // 4
+    sample, coverage = sample_by_token_budget(comments, token_budget=budget, seed=7)
+    assert _cost(sample) <= budget
+    assert 0 < coverage < 1
+    assert coverage == len(sample) / len(comments)
+    positions = [int(comment.comment_id) for comment in sample]
+    assert positions == sorted(positions)
+
+
+def test_every_period_is_represented():
+    comments = _comments(500)
+    sample, _ = sample_by_token_budget(comments, token_budget=_cost(CommentCorpus(comments)) // 5, strata=10, seed=1)
+    days = {comment.published_at[:10] for comment in sample}
+    assert len(days) >= 20
+
+
+def test_seed_makes_sampling_repeatable():
+    comments = _comments(300)
+    budget = _cost(CommentCorpus(comments)) // 3
+    first, _ = sample_by_token_budget(comments, token_budget=budget, seed=3)
+    second, _ = sample_by_token_budget(comments, token_budget=budget, seed=3)
+    assert [comment.comment_id for comment in first] == [comment.comment_id for comment in second]
+
+
+def test_coverage_counts_collapsed_duplicates():
+    comments = _comments(200)
+    comments[0].multiplicity = 100
+    sample, coverage = sample_by_token_budget(comments, token_budget=10**6)
+    assert coverage == 1.0
+    sample, coverage = sample_by_token_budget(comments, token_budget=_cost(CommentCorpus(comments)) // 2, seed=0)
+    assert coverage == sample.total_multiplicity / 299
@@ -0,0 +1,20 @@
+from twitter_comments import ReplyTally, categorize_replies, score_reply
+
+
+def test_keywords_match_whole_words_and_endings():
+    assert score_reply("thanks, this was helpful") == (True, False)
+    assert score_reply("unlikely to flag anything") == (False, False)
+    assert score_reply("the audio lags") == (False, True)
+
+
+def test_mixed_reply_counts_as_both():
+    analysis = categorize_replies(["Great video but the audio is bad", "Love it", "ok"])
+    assert (analysis["positive"], analysis["negative"], analysis["neutral"]) == (2, 1, 1)
+
+
+def test_tally_accumulates_across_updates():
+    tally = ReplyTally()
+    tally.update(["great recursion video", "recursion is hard"])
+    tally.update(["recursion again"])
+    assert tally.sentiment_counts == {"positive": 1, "negative": 0, "neutral": 2}
+    assert tally.analysis()["themes"][0] == ("recursion", 3)
@@ -0,0 +1,172 @@
+import datetime
+
+import requests
+import tweepy
+
+import twitter_comments
+from comment_store import CommentStore
+from comments import sync_video_comments
+from twitter_comments import sync_tweet_replies
+
+PAGE_SIZE = 10
+
+
+def _store(tmp_path):
+    return CommentStore(str(tmp_path / "comments.sqlite3"))
+
+
+class _Request:
+    def __init__(self, response):
+        self.response = response
+
+    def execute(self):
+        return self.response
+
+
+class FakeVideo:
+    """commentThreads().list over threads newest first; a page token is the id of the page's first thread."""
+
+    def __init__(self, count):
+        self.ids = []
+        self.add(count)
+
+    def add(self, count):
+        start = len(self.ids)
+        self.ids = [f"t{i}" for i in range(start + count - 1, start - 1, -1)] + self.ids
+
+    def commentThreads(self):
+        return self
+
+    def list(self, pageToken=None, **kwargs):
+        start = self.ids.index(pageToken) if pageToken else 0
+        page = self.ids[start:start + PAGE_SIZE]
+        response = {"items": [self._thread(thread_id) for thread_id in page]}
+        if start + PAGE_SIZE < len(self.ids):
+            response["nextPageToken"] = self.ids[start + PAGE_SIZE]
+        return _Request(response)
+
+    @staticmethod
+    def _thread(thread_id):
+        comment = {"id": thread_id, "snippet": {"textOriginal": f"comment {thread_id}", "publishedAt": "2024-01-01T00:00:00Z"}}
+        return {"id": thread_id, "snippet": {"topLevelComment": comment, "totalReplyCount": 0}}
+
+
+class FakeSearch:
+    """search_recent_tweets over replies with ids 1..n; a next_token is the id of the page's first reply."""
+
+    def __init__(self, count, rate_limit_on_call=None):
+        self.count = count
+        self.rate_limit_on_call = rate_limit_on_call
+        self.calls = 0
+
+    def search_recent_tweets(self, query, max_results, since_id=None, next_token=None, **kwargs):
+        self.calls += 1
+        if self.calls == self.rate_limit_on_call:
+            response = requests.Response()
+            response.status_code = 429
+            response._content = b'{"errors": [{"message": "Too Many Requests"}]}'
+            raise tweepy.TooManyRequests(response)
+        top = int(next_token) if next_token else self.count
+        floor = int(since_id) if since_id else 0
+        page = list(range(top, floor, -1))[:max_results]
+        meta = {"result_count": len(page)}
+        if page and page[-1] - 1 > floor:
+            meta["next_token"] = str(page[-1] - 1)
+        return tweepy.Response([self._tweet(tweet_id) for tweet_id in page] or None, {}, [], meta)
+
+    @staticmethod
+    def _tweet(tweet_id):
+        created_at = datetime.datetime(2024, 1, 1) + datetime.timedelta(minutes=tweet_id)
+        return tweepy.Tweet({
+            "id": str(tweet_id), "text": f"reply {tweet_id}", "conversation_id": "7", "author_id": "9",
+            "created_at": created_at.strftime("%Y-%m-%dT%H:%M:%S.000Z"), "edit_history_tweet_ids": [str(tweet_id)],
+        })
+
+
+def _ids(comments):
+    return [comment.comment_id for comment in comments]
+
+
+def test_capped_video_sync_saves_resume_token(tmp_path):
+    store = _store(tmp_path)
+    added = sync_video_comments(FakeVideo(50), "v", store, max_threads=15)
+    # The cap is applied at the end of a page
+    assert _ids(added) == [f"t{i}" for i in range(49, 29, -1)]
+    assert store.sync_state("youtube", "v")[0] == "t49"
+    assert store.sync_state("youtube", "v")[3] == "t29"
+
+
+def test_video_sync_fills_gap_before_head(tmp_path):
+    store = _store(tmp_path)
+    video = FakeVideo(50)
+    sync_video_comments(video, "v", store, max_threads=10)
+    video.add(30)
+
+    # The gap (t39..t0) uses 40 of the 50 threads, leaving one page for the head
+    added = sync_video_comments(video, "v", store, max_threads=50)
+    assert _ids(added) == [f"t{i}" for i in range(39, -1, -1)] + [f"t{i}" for i in range(79, 69, -1)]
+    assert store.sync_state("youtube", "v")[0] == "t79"
+    assert store.sync_state("youtube", "v")[3] == "t69"
+
+    added = sync_video_comments(video, "v", store, max_threads=50)
+    assert _ids(added) == [f"t{i}" for i in range(69, 49, -1)]
+    assert store.sync_state("youtube", "v")[3] is None
+    assert len(store.load_comments("youtube", "v")) == 80
+
+
+def test_video_sync_stops_when_gap_is_still_capped(tmp_path):
+    store = _store(tmp_path)
+    video = FakeVideo(50)
+    sync_video_comments(video, "v", store, max_threads=10)
+    video.add(10)
+
+    added = sync_video_comments(video, "v", store, max_threads=20)
+    assert _ids(added) == [f"t{i}" for i in range(39, 19, -1)]
+    # The head is left for once the gap is filled
+    assert store.sync_state("youtube", "v")[0] == "t49"
+    assert store.sync_state("youtube", "v")[3] == "t19"
+
+
+def test_capped_reply_sync_saves_resume_token(tmp_path):
+    store = _store(tmp_path)
+    added, complete = sync_tweet_replies(FakeSearch(50), "c", store, max_replies=20)
+    assert complete
+    assert _ids(added) == [str(i) for i in range(50, 30, -1)]
+    state = store.sync_state("x", "c")
+    assert (state[0], state[3], state[4]) == ("50", "30", None)
+
+
+def test_reply_sync_fills_gap_before_head(tmp_path):
+    store = _store(tmp_path)
+    search = FakeSearch(50)
+    sync_tweet_replies(search, "c", store, max_replies=20)
+    search.count = 80
+
+    # The gap (30..1) uses 30 of the 40 replies, leaving 10 for the head
+    added, complete = sync_tweet_replies(search, "c", store, max_replies=40)
+    assert complete
+    assert _ids(added) == [str(i) for i in range(30, 0, -1)] + [str(i) for i in range(80, 70, -1)]
+    state = store.sync_state("x", "c")
+    assert (state[0], state[3], state[4]) == ("80", "70", "50")
+
+    added, complete = sync_tweet_replies(search, "c", store, max_replies=40)
+    assert complete
+    assert _ids(added) == [str(i) for i in range(70, 50, -1)]
+    assert store.sync_state("x", "c")[3] is None
+    assert len(store.load_comments("x", "c")) == 80
+
+
+def test_rate_limited_reply_sync_resumes(tmp_path, monkeypatch):
+    monkeypatch.setattr(twitter_comments, "RATE_LIMIT_RETRIES", 0)
+    monkeypatch.setattr(twitter_comments, "SEARCH_PAGE_SIZE", 10)
+    store = _store(tmp_path)
+    search = FakeSearch(30, rate_limit_on_call=2)
+    added, complete = sync_tweet_replies(search, "c", store, max_replies=100)
+    assert not complete
+    assert _ids(added) == [str(i) for i in range(30, 20, -1)]
+    assert store.sync_state("x", "c")[3] == "20"
+
+    added, complete = sync_tweet_replies(search, "c", store, max_replies=100)
+    assert complete
+    assert _ids(added) == [str(i) for i in range(20, 0, -1)]
+    assert store.sync_state("x", "c")[3] is None
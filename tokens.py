@@ -0,0 +1,27 @@
+import threading
+
+# GPT-2 BPE: a close local estimate of Gemini's token counts for budgeting chunks and samples
+ENCODING_NAME = "gpt2"
+
+_encoder = None
+_encoder_lock = threading.Lock()
+
+
+def get_encoder():
+    """Return the shared tiktoken encoder, loading it once per process."""
+    global _encoder
+    with _encoder_lock:
+        if _encoder is None:
+            import tiktoken
+
+            _encoder = tiktoken.get_encoding(ENCODING_NAME)
+        return _encoder
+
+
+def count_tokens(text):
+    return len(get_encoder().encode(text, disallowed_special=()))
+
+
+def count_tokens_batch(texts):
+    """Token counts for many texts, encoded in parallel by tiktoken."""
+    return [len(tokens) for tokens in get_encoder().encode_ordinary_batch(list(texts))]
@@ -0,0 +1,189 @@
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from records import CommentCorpus
+from sentiment_model import SENTIMENT_THREADS, LocalTransformer
+
+# Sentence embedding model for topic clustering; downloaded on first use, then loaded from the cache only
+EMBEDDING_MODEL = os.getenv("ECHOPULSE_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+EMBEDDING_MAX_LENGTH = 128
+EMBEDDING_BATCH_TOKENS = 8192
+# Topic count grows with the corpus (about sqrt(n / 2)) within these bounds
+MIN_TOPICS = 2
+MAX_TOPICS = 8
+KMEANS_BATCH_SIZE = 1024
+KMEANS_ITERATIONS = 100
+# Comments nearest each topic's center that stand in for it when summarizing
+REPRESENTATIVES_PER_TOPIC = 8
+LABEL_WORDS = 3
+# Words too common to name a topic
+STOPWORDS = frozenset(
+    "a an the and or but if so of to in on at by for with from as is are was were be been being am "
+    "it its it's this that these those there here i me my we our you your he she they them their his her "
+    "not no yes do does did done have has had will would can could should just very really also too "
+    "what which who when where why how all any some more most than then only about into out up down "
+    "over again like get got one im dont thats".split()
+)
+# Words of lowercased comment text, as counted for topic labels and extractive ranking
+WORD_PATTERN = re.compile(r"[a-z][a-z']+")
+
+
+class LocalEmbedder(LocalTransformer):
+    """Mean-pooled transformer sentence embeddings on CPU, run in length-sorted batches."""
+
+    def __init__(self, model_name=EMBEDDING_MODEL, threads=SENTIMENT_THREADS,
+                 max_length=EMBEDDING_MAX_LENGTH, batch_tokens=EMBEDDING_BATCH_TOKENS):
+        super().__init__(model_name, threads, max_length, batch_tokens)
+
+    def embed(self, texts):
+        """Return an (n, dim) float32 array of unit-length embeddings."""
+        import numpy as np
+        import torch
+
+        texts = list(texts)
+        started = time.perf_counter()
+        vectors = None
+
+        def read(batch, inputs, outputs):
+            nonlocal vectors
+            hidden = outputs.last_hidden_state
+            mask = inputs["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+            pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+            pooled = torch.nn.functional.normalize(pooled, dim=-1).numpy()
+            if vectors is None:
+                vectors = np.empty((len(texts), pooled.shape[1]), dtype=np.float32)
+            vectors[batch] = pooled
+
+        self._run_batches(texts, read)
+        elapsed = time.perf_counter() - started
+        self.last_stats = {
+            "comments": len(texts),
+            "seconds": elapsed,
+            "comments_per_second": len(texts) / elapsed if elapsed else float("inf"),
+        }
+        return vectors
+
+
+def _kmeans_plus_plus(vectors, k, rng):
+    """Pick k spread-out starting centers (k-means++ on cosine distance)."""
+    import numpy as np
+
+    centers = [vectors[rng.integers(len(vectors))]]
+    distances = np.maximum(1.0 - vectors @ centers[0], 0.0)
+    for _ in range(1, k):
+        weights = distances ** 2
+        total = weights.sum()
+        index = rng.choice(len(vectors), p=weights / total) if total > 0 else rng.integers(len(vectors))
+        centers.append(vectors[index])
+        distances = np.minimum(distances, np.maximum(1.0 - vectors @ vectors[index], 0.0))
+    return np.array(centers, dtype=np.float32)
+
+
+def minibatch_kmeans(vectors, k, batch_size=KMEANS_BATCH_SIZE, iterations=KMEANS_ITERATIONS, seed=0):
+    """Spherical mini-batch k-means on unit vectors; returns (centers, labels).
+
+    Each iteration assigns a random batch to its nearest centers with one matrix product and
+    moves every center toward its batch mean with a per-center learning rate of
+    batch_count / total_count (Sculley, 2010).
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    n = len(vectors)
+    k = max(1, min(k, n))
+    seed_sample = vectors[rng.choice(n, size=min(n, max(batch_size, 20 * k)), replace=False)]
+    centers = _kmeans_plus_plus(seed_sample, k, rng)
+    counts = np.zeros(k)
+    for _ in range(iterations if n > batch_size else max(10, iterations // 10)):
+        batch = vectors[rng.choice(n, size=min(batch_size, n), replace=False)]
+        nearest = np.argmax(batch @ centers.T, axis=1)
+        batch_counts = np.bincount(nearest, minlength=k)
+        sums = np.zeros_like(centers)
+        np.add.at(sums, nearest, batch)
+        counts += batch_counts
+        moved = batch_counts > 0
+        rate = (batch_counts[moved] / counts[moved])[:, None]
+        centers[moved] = (1 - rate) * centers[moved] + rate * (sums[moved] / batch_counts[moved][:, None])
+        centers /= np.maximum(np.linalg.norm(centers, axis=1, keepdims=True), 1e-12)
+    labels = np.argmax(vectors @ centers.T, axis=1)
+    return centers, labels
+
+
+def _topic_labels(word_lists, labels, k):
+    """Name each topic by the words most concentrated in it."""
+    per_topic = [Counter() for _ in range(k)]
+    for words, label in zip(word_lists, labels):
+        per_topic[label].update(words)
+    overall = Counter()
+    for counts in per_topic:
+        overall.update(counts)
+    names = []
+    for counts in per_topic:
+        # Frequent in this topic and rare elsewhere
+        scored = sorted(counts.items(), key=lambda item: item[1] * item[1] / overall[item[0]], reverse=True)
+        names.append(", ".join(word for word, _ in scored[:LABEL_WORDS]))
+    return names
+
+
+def cluster_topics(comments, topic_count=None, embedder=None, seed=0):
+    """Cluster comments into topics, largest first.
+
+    Each topic is a dict with its `label` (distinctive words), `size` (original comments,
+    counting collapsed duplicates), `share` of all comments, and `representatives`: the
+    comments nearest its center, which stand in for the topic when summarizing.
+    """
+    import numpy as np
+
+    comments = comments if isinstance(comments, CommentCorpus) else CommentCorpus(comments)
+    if not len(comments):
+        return []
+    if topic_count is None:
+        topic_count = min(MAX_TOPICS, max(MIN_TOPICS, round(math.sqrt(len(comments) / 2))))
+
+    vectors = (embedder or get_embedder()).embed(comments.texts)
+    centers, labels = minibatch_kmeans(vectors, topic_count, seed=seed)
+    k = len(centers)
+    word_lists = [[word for word in WORD_PATTERN.findall(text.lower()) if word not in STOPWORDS] for text in comments.texts]
+    names = _topic_labels(word_lists, labels, k)
+    multiplicity = np.array([comment.multiplicity for comment in comments])
+    total = int(multiplicity.sum())
+
+    topics = []
+    for topic in range(k):
+        members = np.flatnonzero(labels == topic)
+        if not len(members):
+            continue
+        similarity = vectors[members] @ centers[topic]
+        nearest = members[np.argsort(-similarity)[:REPRESENTATIVES_PER_TOPIC]]
+        size = int(multiplicity[members].sum())
+        topics.append({
+            "label": names[topic] or f"topic {topic + 1}",
+            "size": size,
+            "share": size / total,
+            "representatives": CommentCorpus(comments[i] for i in nearest),
+        })
+    topics.sort(key=lambda topic: topic["size"], reverse=True)
+    return topics
+
+
+def topic_sections(topics):
+    """One summarizer input per topic: a header with its name and size, then its representatives."""
+    return [
+        f"Topic: {topic['label']} ({topic['size']} comments, {topic['share']:.0%})\n{topic['representatives'].text}"
+        for topic in topics
+    ]
+
+
+_embedders = {}
+_embedders_lock = threading.Lock()
+
+
+def get_embedder(threads=SENTIMENT_THREADS):
+    """Return the process-wide LocalEmbedder for a thread count."""
+    with _embedders_lock:
+        if threads not in _embedders:
+            _embedders[threads] = LocalEmbedder(threads=threads)
+        return _embedders[threads]
@@ -1,23 +1,30 @@
 import streamlit as st
-import tweepy
 import re
+import time
+import heapq
+from collections import Counter
+from operator import itemgetter
 from dotenv import load_dotenv
+from comment_store import get_comment_store
+from metrics import get_metrics
+from clients import FetchError, get_twitter_client
+from records import Comment, CommentCorpus
+from topics import STOPWORDS
 
 # Load environment variables (Ensure .env file contains the secrets)
 load_dotenv()
 
-# Load API keys from secrets (should be in the Streamlit secrets)
-twitter_api_key = st.secrets["TWITTER_API_KEY"]
-twitter_api_secret = st.secrets["TWITTER_API_KEY_SECRET"]
-twitter_access_token = st.secrets["TWITTER_ACCESS_TOKEN"]
-twitter_access_secret = st.secrets["TWITTER_ACCESS_TOKEN_SECRET"]
-twitter_bearer = st.secrets["TWITTER_BEARER_TOKEN"]
+# Recent search returns between 10 and 100 tweets per page
+SEARCH_PAGE_SIZE = 100
+# 429s are retried once the rate-limit window resets; after this many, partial results are returned
+RATE_LIMIT_RETRIES = 3
+MAX_RATE_LIMIT_WAIT_SECONDS = 15 * 60
 
-# Use Tweepy's Client for API v2 (OAuth 2.0 Bearer Token)
+# Use Tweepy's Client for API v2 (OAuth 2.0 Bearer Token).
+# The client is shared process-wide (see clients) and built on first use.
 def initialize_twitter_client_v2():
-    """Initialize the Twitter API client using Tweepy (API v2)."""
-    client = tweepy.Client(bearer_token=twitter_bearer)
-    return client
+    """Return the shared Twitter API client using Tweepy (API v2)."""
+    return get_twitter_client()
 
 def extract_tweet_id_from_url(tweet_url):
     """Extract the Tweet ID from the provided URL."""
@@ -28,82 +35,294 @@ def extract_tweet_id_from_url(tweet_url):
         st.error("Invalid tweet URL. Please provide a valid URL.")
         return None
 
-def fetch_tweet_replies(client, tweet_id, max_replies=100):
-    """Fetch replies to a specific tweet using the Twitter API v2."""
+def _to_comment(tweet):
+    metrics = tweet.public_metrics or {}
+    return Comment(
+        str(tweet.id),
+        parent_id=str(tweet.conversation_id) if tweet.conversation_id else None,
+        author=str(tweet.author_id) if tweet.author_id else None,
+        text=tweet.text,
+        like_count=metrics.get("like_count", 0),
+        reply_count=metrics.get("reply_count", 0),
+        published_at=tweet.created_at.isoformat() if tweet.created_at else None,
+    )
+
+def _rate_limit_wait(retry_state):
+    """Seconds until the 429's x-rate-limit-reset window reopens, or exponential backoff without it."""
+    response = getattr(retry_state.outcome.exception(), "response", None)
+    reset = response.headers.get("x-rate-limit-reset") if response is not None else None
+    if reset:
+        return min(MAX_RATE_LIMIT_WAIT_SECONDS, max(1.0, float(reset) - time.time() + 1))
+    return min(MAX_RATE_LIMIT_WAIT_SECONDS, 2 ** retry_state.attempt_number)
+
+def _rate_limited_retrying(before_sleep=None):
+    """tenacity Retrying that waits out X 429s, re-raising TooManyRequests once retries run out."""
+    import tweepy
+    from tenacity import Retrying, retry_if_exception_type, stop_after_attempt
+    return Retrying(
+        retry=retry_if_exception_type(tweepy.TooManyRequests),
+        wait=_rate_limit_wait,
+        stop=stop_after_attempt(RATE_LIMIT_RETRIES + 1),
+        before_sleep=before_sleep,
+        reraise=True,
+    )
+
+def iter_tweet_replies(client, conversation_id, max_replies=100, since_id=None, on_progress=None,
+                       next_token=None, cursor=None):
+    """Yield replies in a conversation newest first, following next_token page by page.
+
+    Rate limits are waited out using x-rate-limit-reset; when retries run out the
+    TooManyRequests error propagates, after every reply fetched so far has been yielded.
+    `on_progress(fetched, max_replies, message)` is called after each page and before waits.
+    Pages are never cut short (X returns at least 10 per page), so up to 9 replies past
+    `max_replies` may be yielded; `cursor["next_token"]`, when a dict is passed, is left
+    pointing at the first page not fetched (None once the search is exhausted).
+    """
+    import tweepy
+    fetched = 0
+
+    def report_wait(retry_state):
+        if on_progress:
+            on_progress(fetched, max_replies, f"Rate limited by X, resuming in {retry_state.next_action.sleep:.0f}s")
+
+    retrying = _rate_limited_retrying(before_sleep=report_wait)
+    cursor = cursor if cursor is not None else {}
+    cursor["next_token"] = next_token
+    while fetched < max_replies:
+        try:
+            response = retrying(
+                client.search_recent_tweets,
+                query=f"conversation_id:{conversation_id} is:reply",
+                tweet_fields=["author_id", "conversation_id", "created_at", "public_metrics", "text"],
+                max_results=min(SEARCH_PAGE_SIZE, max(10, max_replies - fetched)),
+                since_id=since_id,
+                next_token=next_token,
+            )
+        except tweepy.BadRequest:
+            if since_id is None or fetched:
+                raise
+            # since_id fell outside the 7-day search window; fall back to a full search from the top
+            since_id = next_token = None
+            continue
+        get_metrics().inc("echopulse_api_quota_units_total", api="x")
+
+        next_token = (response.meta or {}).get("next_token")
+        for tweet in response.data or []:
+            yield tweet
+            fetched += 1
+        cursor["next_token"] = next_token
+        if on_progress:
+            on_progress(fetched, max_replies, None)
+        if not next_token:
+            return
+
+def get_conversation_id(client, tweet_id):
+    """Return the conversation_id of a tweet, or None if the tweet was not found."""
+    original_tweet = _rate_limited_retrying()(client.get_tweet, tweet_id, tweet_fields=["conversation_id"])
+    get_metrics().inc("echopulse_api_quota_units_total", api="x")
+    if not original_tweet.data:
+        return None
+    return str(original_tweet.data.get("conversation_id"))
+
+def _sync_replies_pass(client, conversation_id, store, max_replies, since_id, next_token, on_progress):
+    """Store replies newest first; return (added, newest id, resume token, replies read, rate limited)."""
+    import tweepy
+    cursor = {}
+    newest_id = None
+    added = []
+    pending = []
+    fetched = 0
+    rate_limited = False
     try:
-        replies = []
-        
-        # Fetch the original tweet to get its conversation_id
-        original_tweet = client.get_tweet(tweet_id, tweet_fields=["conversation_id"])
-        
-        if not original_tweet.data:
-            st.error("Could not find the original tweet.")
-            return None
-        
-        conversation_id = original_tweet.data.get("conversation_id")
-        
-        # Search for replies using the conversation_id
-        query = f"conversation_id:{conversation_id} is:reply"
-        
-        # Fetch replies
-        response = client.search_recent_tweets(
-            query=query,
-            tweet_fields=["author_id", "created_at", "text"],
-            max_results=max_replies
+        for tweet in iter_tweet_replies(client, conversation_id, max_replies, since_id, on_progress,
+                                        next_token=next_token, cursor=cursor):
+            newest_id = newest_id or str(tweet.id)
+            pending.append(_to_comment(tweet))
+            fetched += 1
+            if len(pending) >= SEARCH_PAGE_SIZE:
+                added += store.add_comments("x", conversation_id, pending)
+                pending = []
+    except tweepy.TooManyRequests:
+        rate_limited = True
+    added += store.add_comments("x", conversation_id, pending)
+    return added, newest_id, cursor.get("next_token"), fetched, rate_limited
+
+def sync_tweet_replies(client, conversation_id, store, max_replies=100, on_progress=None):
+    """Store replies newer than the last sync and return (new Comment records, complete).
+
+    `complete` is False when X kept rate limiting; the replies fetched before that are
+    still stored and returned. A sync that stops early, at `max_replies` or on the rate
+    limit, records the page where it stopped and the previous high-water mark; the next
+    sync fills that gap before searching for newer replies, so no reply in between is skipped.
+    """
+    state = store.sync_state("x", conversation_id)
+    since_id = state[0] if state else None
+    added = []
+    if state is not None and state[3]:
+        # The gap runs from the saved page down to the mark the interrupted sync started from
+        gap_added, _, resume, fetched, rate_limited = _sync_replies_pass(
+            client, conversation_id, store, max_replies, state[4], state[3], on_progress,
         )
-        
-        if response.data:
-            for tweet in response.data:
-                replies.append(tweet.text)
-        
-        return replies
-    
+        added += gap_added
+        store.mark_synced("x", conversation_id, resume_token=resume, resume_floor_id=state[4] if resume else None)
+        if rate_limited:
+            return added, False
+        max_replies -= fetched
+        if resume is not None or max_replies <= 0:
+            return added, True
+
+    head_added, newest_id, resume, _, rate_limited = _sync_replies_pass(
+        client, conversation_id, store, max_replies, since_id, None, on_progress,
+    )
+    added += head_added
+    if newest_id is not None:
+        store.mark_synced("x", conversation_id, newest_id, resume_token=resume, resume_floor_id=since_id if resume else None)
+    else:
+        store.mark_synced("x", conversation_id)
+    return added, not rate_limited
+
+def fetch_tweet_replies(client, tweet_id, max_replies=100, store=None, on_progress=None):
+    """Fetch replies to a specific tweet using the Twitter API v2; return (corpus, warning).
+
+    Replies are kept in the local comment store, so a repeat request only searches
+    for replies newer than the last one seen (`since_id`). If X keeps rate limiting,
+    the replies fetched so far are returned with a warning (None otherwise) for the
+    caller to show, or FetchError is raised when there are none yet; other API
+    failures raise FetchError too.
+    """
+    import tweepy
+    store = store or get_comment_store()
+    metrics = get_metrics()
+    started = time.perf_counter()
+    try:
+        # Fetch the original tweet to get its conversation_id
+        conversation_id = get_conversation_id(client, tweet_id)
+        if conversation_id is None:
+            raise FetchError("Could not find the original tweet.", permanent=True)
+
+        added, complete = sync_tweet_replies(client, conversation_id, store, max_replies, on_progress)
+        corpus = CommentCorpus(store.load_comments("x", conversation_id, limit=max_replies, newest_first=True))
+        warning = None
+        if not complete:
+            if not corpus:
+                # Nothing to show yet; an error (unlike an empty result) is retried by the next request
+                raise FetchError("X rate limit reached before any replies were fetched. Please try again later.")
+            warning = f"X rate limit reached; showing the {len(added)} new replies fetched so far."
+
+        metrics.observe("echopulse_stage_seconds", time.perf_counter() - started, stage="x_fetch")
+        metrics.inc("echopulse_comments_processed_total", len(corpus), stage="x_fetch")
+        return corpus, warning
+
+    except tweepy.NotFound as e:
+        raise FetchError("Could not find the original tweet.", permanent=True) from e
     except tweepy.TweepyException as e:
-        st.error(f"Error fetching replies: {e}")
-        return None
+        raise FetchError(f"Error fetching replies: {e}") from e
 
 def load_replies_in_format(replies):
-    """Aggregate replies into a single formatted string."""
-    formatted_replies = "\n".join(replies) if replies else "No replies found."
+    """Aggregate replies (strings or Comment records) into a single formatted string."""
+    formatted_replies = "\n".join(getattr(reply, "text", reply) for reply in replies) if replies else "No replies found."
     return formatted_replies
 
 
-def categorize_replies(replies):
-    """Categorize replies into positive, negative, and themes."""
-    positive_keywords = ["good", "great", "excellent", "amazing", "awesome", "fantastic", "incredible", "wonderful", "brilliant", "outstanding", "thank", "appreciate", "grateful", "love", "admire", "respect", "support", "happy", "proud", "inspiring", "encouraging", "hopeful", "positive", "motivated", "excited", "yay", "wow", "fun", "enjoy", "laugh", "like", "thrilled", "helpful", "insightful", "informative", "useful", "educational", "clear", "simple", "effective", "innovative", "creative", "clever", "advanced", "futuristic", "revolutionary", "fast", "reliable", "responsive", "friendly", "patient", "accommodating", "healthy", "safe", "secure", "caring", "beneficial"]
-    negative_keywords = ["bad", "terrible", "horrible", "awful", "poor", "worse", "worst", "hate", "dislike", "annoyed", "frustrating", "disappointing", "upset", "angry", "irritated", "sad", "sorry", "regret", "pity", "hurt", "unfortunate", "worried", "depressed", "useless", "unhelpful", "unnecessary", "pointless", "boring", "irrelevant", "problem", "issue", "fail", "failure", "broken", "wrong", "misleading", "unclear", "mistake", "unsafe", "harmful", "side effects", "risky", "not effective", "slow", "lag", "crash", "error", "bug", "glitch", "outdated", "incompatible", "rude", "unresponsive", "long wait", "unresolved", "unprofessional"]
-    themes = {}
-    sentiment_counts = {"positive": 0, "negative": 0, "neutral": 0}
-
-    for reply in replies:
-        sentiment = "neutral"
-        for word in positive_keywords:
-            if word in reply.lower():
-                sentiment = "positive"
-                sentiment_counts["positive"] += 1
-                break
-        for word in negative_keywords:
-            if word in reply.lower():
-                sentiment = "negative"
-                sentiment_counts["negative"] += 1
-                break
-
-        if sentiment == "neutral":
-            sentiment_counts["neutral"] += 1
-
-        # Extract themes (basic keyword extraction for demonstration)
-        for word in reply.lower().split():
-            themes[word] = themes.get(word, 0) + 1
-
-    sorted_themes = sorted(themes.items(), key=lambda x: x[1], reverse=True)[:5]  # Top 5 themes
-    return {"positive": sentiment_counts["positive"], "negative": sentiment_counts["negative"], "neutral": sentiment_counts["neutral"], "themes": sorted_themes}
-
-def summarize_replies(replies):
-    """Generate a descriptive summary of the comments."""
+POSITIVE_KEYWORDS = ["good", "great", "excellent", "amazing", "awesome", "fantastic", "incredible", "wonderful", "brilliant", "outstanding", "thank", "appreciate", "grateful", "love", "admire", "respect", "support", "happy", "proud", "inspiring", "encouraging", "hopeful", "positive", "motivated", "excited", "yay", "wow", "fun", "enjoy", "laugh", "like", "thrilled", "helpful", "insightful", "informative", "useful", "educational", "clear", "simple", "effective", "innovative", "creative", "clever", "advanced", "futuristic", "revolutionary", "fast", "reliable", "responsive", "friendly", "patient", "accommodating", "healthy", "safe", "secure", "caring", "beneficial"]
+NEGATIVE_KEYWORDS = ["bad", "terrible", "horrible", "awful", "poor", "worse", "worst", "hate", "dislike", "annoyed", "frustrating", "disappointing", "upset", "angry", "irritated", "sad", "sorry", "regret", "pity", "hurt", "unfortunate", "worried", "depressed", "useless", "unhelpful", "unnecessary", "pointless", "boring", "irrelevant", "problem", "issue", "fail", "failure", "broken", "wrong", "misleading", "unclear", "mistake", "unsafe", "harmful", "side effects", "risky", "not effective", "slow", "lag", "crash", "error", "bug", "glitch", "outdated", "incompatible", "rude", "unresponsive", "long wait", "unresolved", "unprofessional"]
+# Keywords also match these endings ("thanks", "appreciated", "failing") but not other words ("unlikely", "flag")
+KEYWORD_SUFFIXES = ["s", "es", "d", "ed", "ing", "ful"]
+THEME_COUNT = 5
+
+def _keyword_alternation(keywords):
+    """Regex alternation of the keywords factored into a prefix trie, so shared prefixes are scanned once."""
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node):
+        branches = [(r"\s+" if char == " " else re.escape(char)) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        if len(branches) == 1 and "" not in node:
+            return branches[0]
+        return "(?:" + "|".join(branches) + ")" + ("?" if "" in node else "")
+
+    return build(trie)
+
+# One compiled pattern scores a reply in a single scan: the named group says which list matched
+SENTIMENT_PATTERN = re.compile(
+    r"\b(?:(?P<negative>" + _keyword_alternation(NEGATIVE_KEYWORDS) + r")|(?P<positive>"
+    + _keyword_alternation(POSITIVE_KEYWORDS) + r"))(?:" + "|".join(KEYWORD_SUFFIXES) + r")?\b"
+)
+
+def score_reply(text):
+    """Return (has_positive, has_negative) keyword hits for an already-lowercased reply."""
+    found = set()
+    for match in SENTIMENT_PATTERN.finditer(text):
+        found.add(match.lastgroup)
+        if len(found) == 2:
+            break
+    return "positive" in found, "negative" in found
+
+class ReplyTally:
+    """Running sentiment counts and theme frequencies, updated one batch of replies at a time."""
+
+    def __init__(self, engine="keywords"):
+        self.engine = engine
+        self.sentiment_counts = {"positive": 0, "negative": 0, "neutral": 0}
+        self.themes = Counter()
+
+    def update(self, replies):
+        """Fold new replies into the running totals; cost is proportional to len(replies)."""
+        started = time.perf_counter()
+        sentiment_counts = self.sentiment_counts
+        model_labels = None
+        if self.engine == "model":
+            from sentiment_model import get_sentiment_model
+            model_labels = get_sentiment_model().classify(replies)
+
+        for index, reply in enumerate(replies):
+            text = reply.lower()
+            if model_labels is not None:
+                sentiment_counts[model_labels[index]] += 1
+            else:
+                # A reply with both kinds of keyword counts as both positive and negative
+                has_positive, has_negative = score_reply(text)
+                if has_positive:
+                    sentiment_counts["positive"] += 1
+                if has_negative:
+                    sentiment_counts["negative"] += 1
+                if not (has_positive or has_negative):
+                    sentiment_counts["neutral"] += 1
+
+            # Extract themes (basic keyword extraction for demonstration)
+            self.themes.update(word for word in text.split() if word not in STOPWORDS)
+
+        metrics = get_metrics()
+        metrics.observe("echopulse_stage_seconds", time.perf_counter() - started, stage=f"categorize_{self.engine}")
+        metrics.inc("echopulse_comments_processed_total", len(replies), stage=f"categorize_{self.engine}")
+
+    def analysis(self):
+        sorted_themes = heapq.nlargest(THEME_COUNT, self.themes.items(), key=itemgetter(1))  # Top 5 themes
+        return {**self.sentiment_counts, "themes": sorted_themes}
+
+def categorize_replies(replies, engine="keywords"):
+    """Categorize replies into positive, negative, and themes.
+
+    `engine` is "keywords" (the compiled keyword matcher) or "model" (the local
+    transformer classifier from sentiment_model).
+    """
+    tally = ReplyTally(engine)
+    tally.update(replies)
+    return tally.analysis()
+
+def summarize_replies(replies, engine="keywords", analysis=None):
+    """Generate a descriptive summary of the comments, reusing `analysis` when already computed."""
     if not replies:
         return "No replies to summarize."
 
-    analysis = categorize_replies(replies)
+    if analysis is None:
+        analysis = categorize_replies(replies, engine=engine)
 
     # Create a narrative description based on the analysis
     summary = "The overall tone of the comments appears "
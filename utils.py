@@ -1,36 +1,48 @@
-import streamlit as st
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_text_splitters import TokenTextSplitter
-from langchain.chains.summarize import load_summarize_chain
 from dotenv import load_dotenv
-
-gemini_api_key = st.secrets['GEMINI_API_KEY']
+from summarizer import MAP_CONCURRENCY, REQUESTS_PER_MINUTE, SummaryEngine
+from llm_cache import get_llm_cache
+from clients import get_chat_model
+from metrics import get_metrics
+from chunking import pack_comments
+from topics import topic_sections
 
 load_dotenv()
 
-def get_summary(text):
-
-    #Tokenization
-    text_splitter = TokenTextSplitter(
-        chunk_size=1000, 
-        chunk_overlap=10
-    )
-    chunks = text_splitter.create_documents([text])
-
-    #Summarization
-    # Correct, stable model name
-    llm = ChatGoogleGenerativeAI(
-    model="gemini-pro-latest",
-    google_api_key=gemini_api_key
-    )
-
-    
-    chain = load_summarize_chain(
-        llm, 
-        chain_type="map_reduce"
+def get_summary_engine(concurrency=MAP_CONCURRENCY, requests_per_minute=REQUESTS_PER_MINUTE):
+    """SummaryEngine over the shared Gemini model and the on-disk summary cache."""
+    # Shared across sessions; see clients.GEMINI_MODEL for the model name
+    return SummaryEngine(
+        get_chat_model(),
+        concurrency=concurrency,
+        requests_per_minute=requests_per_minute,
+        cache=get_llm_cache()
     )
 
-    #Invoke Chain
-    response=chain.run(chunks)
+def get_summary(comments, concurrency=MAP_CONCURRENCY, requests_per_minute=REQUESTS_PER_MINUTE, on_progress=None, on_token=None, on_partial=None):
+    metrics = get_metrics()
+    # Whole comments packed into context-sized chunks, reusing their cached token counts
+    with metrics.timer("chunking"):
+        chunks, _ = pack_comments(comments)
+    if on_progress:
+        on_progress("chunked", len(chunks), len(chunks))
 
-    return response
\ No newline at end of file
+    #Summarization
+    engine = get_summary_engine(concurrency, requests_per_minute)
+
+    #Map chunks concurrently, then reduce, streaming the final summary
+    response = engine.summarize(chunks, on_progress=on_progress, on_token=on_token, on_partial=on_partial)
+
+    return response
+
+def summarize_topics(topics, on_progress=None, on_token=None, on_partial=None):
+    """Summarize each topic from its representatives, then combine them; returns (summary, topic_summaries)."""
+    sections = topic_sections(topics)
+    if on_progress:
+        on_progress("chunked", len(sections), len(sections))
+    engine = get_summary_engine()
+    topic_summaries = engine.map(sections, on_progress=on_progress, on_partial=on_partial)
+    if len(topic_summaries) == 1:
+        if on_token:
+            on_token(topic_summaries[0])
+        return topic_summaries[0], topic_summaries
+    return engine.reduce(topic_summaries, on_progress=on_progress, on_token=on_token), topic_summaries
@@ -0,0 +1,130 @@
+import threading
+import time
+import uuid
+from chunking import pack_comments
+from comment_store import get_comment_store
+from comments import sync_video_comments
+from clients import FetchError, get_twitter_client, youtube_service
+from metrics import get_metrics
+from records import CommentCorpus
+from twitter_comments import ReplyTally, get_conversation_id, sync_tweet_replies
+from utils import get_summary_engine
+
+# Seconds between polls while a watch is open
+WATCH_INTERVAL_SECONDS = 30
+# Replies pulled per X poll; YouTube polls stop at the first thread already stored
+WATCH_MAX_REPLIES = 500
+# New comments are worth a fresh summary once they reach this many and this share of the
+# comments already summarized...
+RESUMMARIZE_MIN_COMMENTS = 25
+RESUMMARIZE_MIN_SHARE = 0.1
+# ...or once any sentiment share has moved this far since the last summary (given a few new comments)
+RESUMMARIZE_SENTIMENT_SHIFT = 0.05
+RESUMMARIZE_SHIFT_MIN_COMMENTS = 5
+
+
+def _shares(counts):
+    total = sum(counts.values()) or 1
+    return {label: count / total for label, count in counts.items()}
+
+
+class Watch:
+    """Polls one video or X conversation and keeps its sentiment, themes and summary current.
+
+    A watch starts from a finished analysis `result`: its summary, comment count and sentiment
+    are the baseline, and the comment store's high-water mark is where polling begins. Each
+    refresh fetches only comments newer than that, folds them into the running tally, and
+    re-summarizes only when the new comments are significant: they are mapped into summary
+    sections and reduced together with the current summary, so earlier comments are never
+    re-read or re-sent to Gemini and each update costs the same however long the watch runs.
+    """
+
+    def __init__(self, source, key, result):
+        self.id = uuid.uuid4().hex
+        self.source = source
+        self.key = key
+        self.engine = result["engine"]
+        self.tally = ReplyTally(self.engine)
+        sentiment = result["sentiment"]
+        for label in self.tally.sentiment_counts:
+            self.tally.sentiment_counts[label] = sentiment[label]
+        # Only the analysis' top themes are known; later comments add to them
+        self.tally.themes.update(dict(sentiment["themes"]))
+        self.summary = result["summary"]
+        self.pending = []
+        self.comment_count = result["comment_count"]
+        self.summarized_count = self.comment_count
+        self.summarized_shares = _shares(self.tally.sentiment_counts)
+        # Latest state for the UI, replaced whole at the end of each refresh
+        self.snapshot = None
+        self._conversation_id = None
+        self._started = False
+        self._lock = threading.Lock()
+
+    def _fetch_new(self, store):
+        """Return Comment records stored since the last refresh.
+
+        When nothing was stored for the source yet (a fast-mode analysis keeps nothing), the
+        first refresh stores what is there as the baseline and returns nothing: the analysis
+        result already accounts for those comments.
+        """
+        if self.source == "youtube":
+            baseline_sync = not self._started and store.sync_state(self.source, self.key) is None
+            with youtube_service() as youtube:
+                added = sync_video_comments(youtube, self.key, store)
+        else:
+            client = get_twitter_client()
+            if self._conversation_id is None:
+                self._conversation_id = get_conversation_id(client, self.key)
+                if self._conversation_id is None:
+                    raise FetchError("Could not find the original tweet.", permanent=True)
+            baseline_sync = not self._started and store.sync_state(self.source, self._conversation_id) is None
+            added, _ = sync_tweet_replies(client, self._conversation_id, store, WATCH_MAX_REPLIES)
+        self._started = True
+        return [] if baseline_sync else added
+
+    def _is_significant(self):
+        if not self.pending:
+            return False
+        threshold = max(RESUMMARIZE_MIN_COMMENTS, RESUMMARIZE_MIN_SHARE * self.summarized_count)
+        if len(self.pending) >= threshold:
+            return True
+        if len(self.pending) < RESUMMARIZE_SHIFT_MIN_COMMENTS:
+            return False
+        shares = _shares(self.tally.sentiment_counts)
+        return any(
+            abs(shares[label] - self.summarized_shares[label]) >= RESUMMARIZE_SENTIMENT_SHIFT
+            for label in shares
+        )
+
+    def _resummarize(self):
+        engine = get_summary_engine()
+        chunks, _ = pack_comments(CommentCorpus(self.pending))
+        self.summary = engine.reduce([self.summary] + engine.map(chunks))
+        self.summarized_count += len(self.pending)
+        self.summarized_shares = _shares(self.tally.sentiment_counts)
+        self.pending = []
+
+    def refresh(self):
+        """Poll once and return the new snapshot."""
+        with self._lock, get_metrics().timer(f"watch_{self.source}"):
+            previous = self.snapshot
+            new_comments = self._fetch_new(get_comment_store())
+            self.tally.update([comment.text for comment in new_comments])
+            self.comment_count += len(new_comments)
+            self.pending += new_comments
+            resummarized = self._is_significant()
+            if resummarized:
+                self._resummarize()
+
+            self.snapshot = {
+                "sentiment": self.tally.analysis(),
+                "previous_sentiment": previous["sentiment"] if previous else None,
+                "summary": self.summary,
+                "new_comments": len(new_comments),
+                "total_comments": self.comment_count,
+                "pending_comments": len(self.pending),
+                "resummarized": resummarized,
+                "refreshed_at": time.time(),
+            }
+            return self.snapshot